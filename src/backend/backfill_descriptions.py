@@ -0,0 +1,87 @@
+"""Offline description backfill.
+
+Scans the movie and book catalogs once, fetches Wikipedia summaries for every title whose
+description is missing or short, and writes them to a sidecar CSV per catalog
+(see CATALOGS[...]["descriptions_csv"]). The recommender merges these at load time.
+
+Progress is checkpointed: results are appended after every batch, and titles already in
+the sidecar are skipped, so an interrupted run resumes where it stopped.
+
+Usage (from project root):
+    python -m src.backend.backfill_descriptions [--media movie|book] [--workers 16] [--batch-size 200]
+"""
+import argparse
+import csv
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.backend.catalog import CATALOGS, load_description_backfill, needs_description
+from src.backend.wiki_enricher import fetch_wiki_summary
+from src.models.schemas import MediaType
+
+
+def _lookup(title):
+    """Returns (looked up, summary or None); looked up is False after a transient error."""
+    try:
+        return True, fetch_wiki_summary(title)
+    except Exception as e:
+        print(f"Wikipedia lookup failed for {title!r}: {e}")
+        return False, None
+
+
+def pending_titles(spec):
+    df = pd.read_csv(spec["csv"])
+    done = load_description_backfill(spec["descriptions_csv"])
+    desc_col = spec["desc_col"]
+    descs = df[desc_col] if desc_col in df.columns else pd.Series([None] * len(df))
+    short = descs.apply(needs_description)
+    titles = df.loc[short.values, spec["title_col"]].dropna().astype(str)
+    return [t for t in dict.fromkeys(titles) if t not in done], len(done)
+
+
+def backfill(spec, workers, batch_size):
+    todo, already = pending_titles(spec)
+    print(f"[{spec['name']}] {already} titles already backfilled, {len(todo)} remaining.")
+    if not todo:
+        return
+
+    path = spec["descriptions_csv"]
+    write_header = not os.path.exists(path)
+    found = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool, open(path, "a", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        if write_header:
+            writer.writerow(["title", "description"])
+        for start in range(0, len(todo), batch_size):
+            batch = todo[start:start + batch_size]
+            results = list(pool.map(_lookup, batch))
+            # Checkpoint: one flushed write per finished batch (misses stored as empty).
+            # Titles that hit a network error are not written, so a re-run retries them.
+            writer.writerows([t, s or ""] for t, (ok, s) in zip(batch, results) if ok)
+            f.flush()
+            os.fsync(f.fileno())
+            found += sum(1 for ok, s in results if s)
+            print(f"[{spec['name']}] {start + len(batch)}/{len(todo)} done ({found} found).")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill missing catalog descriptions from Wikipedia.")
+    parser.add_argument("--media", choices=[m.value for m in MediaType], help="Only backfill one catalog")
+    parser.add_argument("--workers", type=int, default=16)
+    parser.add_argument("--batch-size", type=int, default=200)
+    args = parser.parse_args()
+
+    for media_type, spec in CATALOGS.items():
+        if args.media and media_type.value != args.media:
+            continue
+        backfill(spec, args.workers, args.batch_size)
+
+
+if __name__ == "__main__":
+    main()
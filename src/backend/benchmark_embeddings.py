@@ -0,0 +1,87 @@
+"""Embedding backend benchmark on real catalog text.
+
+Encodes the same sample of catalog rows with each backend and reports bulk throughput,
+single-query latency and agreement (cosine similarity) with the PyTorch reference.
+
+Usage (from project root):
+    python -m src.backend.benchmark_embeddings [--media movie|book] [--rows 2000] [--queries 200]
+        [--backends torch,onnx-int8,openvino-int8]
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.backend.catalog import CATALOGS
+from src.backend.embeddings import load_embeddings
+from src.models.schemas import MediaType
+
+
+def unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def run_backend(backend, texts, queries):
+    start = time.perf_counter()
+    embedder = load_embeddings(backend)
+    load_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    doc_vectors = unit_rows(embedder.embed_documents(texts))
+    bulk_s = time.perf_counter() - start
+
+    latencies = []
+    for q in queries:
+        start = time.perf_counter()
+        embedder.embed_query(q)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    return {
+        "backend": backend,
+        "impl": type(embedder).__name__,
+        "load_s": round(load_s, 2),
+        "docs_per_s": round(len(texts) / bulk_s, 1),
+        "query_p50_ms": round(float(np.percentile(latencies, 50)), 2),
+        "query_p95_ms": round(float(np.percentile(latencies, 95)), 2),
+    }, doc_vectors
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark embedding backends on catalog text.")
+    parser.add_argument("--media", choices=[m.value for m in MediaType], default=MediaType.movie.value)
+    parser.add_argument("--rows", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--backends", default="torch,onnx,onnx-int8,openvino,openvino-int8")
+    args = parser.parse_args()
+
+    spec = CATALOGS[MediaType(args.media)]
+    df = pd.read_csv(spec["csv"], nrows=args.rows)
+    texts = df[spec["text_col"]].fillna("").astype(str).tolist()
+    queries = texts[:args.queries]
+    backends = [b.strip() for b in args.backends.split(",") if b.strip()]
+    # torch is the reference the others are compared against, so it always runs first
+    backends = ["torch"] + [b for b in backends if b != "torch"]
+
+    results, reference = [], None
+    for backend in backends:
+        print(f"\nBenchmarking {backend} on {len(texts)} {spec['name']} rows...")
+        stats, vectors = run_backend(backend, texts, queries)
+        if backend == "torch":
+            reference = vectors
+        cos = np.sum(vectors * reference, axis=1)
+        stats["cos_vs_torch_mean"] = round(float(cos.mean()), 4)
+        stats["cos_vs_torch_min"] = round(float(cos.min()), 4)
+        results.append(stats)
+
+    print("\n" + pd.DataFrame(results).to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
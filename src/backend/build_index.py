@@ -0,0 +1,217 @@
+"""Offline, parallel and resumable vector index build.
+
+Streams a catalog CSV in fixed-size shards, encodes the shards across a process pool
+(one single-threaded embedding model per CPU core) and checkpoints every finished shard
+under <persist_dir>.build/. Re-running after an interruption only encodes the missing
+shards. Once all shards exist they are written into a fresh Chroma directory that is
+swapped into place, so the API server only has to open it. With --backend numpy the
+shards are concatenated into a memory-mapped NumPy index (see vector_index.py) instead.
+
+Usage (from project root):
+    python -m src.backend.build_index [--media movie|book] [--workers N] [--shard-size 2000] [--fresh]
+        [--backend chroma|numpy]
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+import numpy as np
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.backend.catalog import CATALOGS, index_documents
+from src.backend.embeddings import embedding_model_id, load_embeddings
+from src.models.schemas import MediaType
+
+# Max documents per Chroma upsert call
+WRITE_BATCH_SIZE = 1000
+
+# Workers start from a fresh interpreter: forking after onnxruntime / torch have started
+# their thread pools can deadlock the children
+_SPAWN = multiprocessing.get_context("spawn")
+
+_worker_embedder = None
+
+
+def _init_worker(model_id):
+    """Loads one single-threaded embedding model per worker process."""
+    global _worker_embedder
+    os.environ["EMBEDDING_THREADS"] = "1"
+    os.environ["OMP_NUM_THREADS"] = "1"
+    _worker_embedder = load_embeddings()
+    # Every shard must come from the model recorded in the row metadata
+    if embedding_model_id(_worker_embedder) != model_id:
+        raise RuntimeError(f"Worker loaded {embedding_model_id(_worker_embedder)}, expected {model_id}")
+
+
+def _load_model_id():
+    """Runs in a throwaway process, so the parent never holds a model of its own."""
+    return embedding_model_id(load_embeddings())
+
+
+def _encode_shard(shard_path, texts):
+    vectors = np.asarray(_worker_embedder.embed_documents(texts), dtype=np.float32)
+    tmp_path = shard_path + ".tmp.npy"
+    np.save(tmp_path, vectors)
+    os.replace(tmp_path, shard_path)  # Atomic: a shard file only exists once it is complete
+    return shard_path
+
+
+def _manifest(spec, shard_size, model_id):
+    stat = os.stat(spec["csv"])
+    return {
+        "csv": spec["csv"],
+        "csv_size": stat.st_size,
+        "csv_mtime": stat.st_mtime,
+        "shard_size": shard_size,
+        "embedding_model": model_id,
+    }
+
+
+def _prepare_build_dir(build_dir, manifest, fresh):
+    """Keeps checkpoints only if they were produced from the same CSV and settings."""
+    manifest_path = os.path.join(build_dir, "manifest.json")
+    if os.path.exists(build_dir) and not fresh:
+        try:
+            with open(manifest_path) as f:
+                if json.load(f) == manifest:
+                    return
+        except (OSError, ValueError):
+            pass
+        print(f"Checkpoints in {build_dir} are stale, starting over.")
+    shutil.rmtree(build_dir, ignore_errors=True)
+    os.makedirs(build_dir)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f)
+
+
+def _shards(spec, shard_size, model_id):
+    """Yields (shard_no, texts, ids, metadatas), streaming the CSV chunk by chunk."""
+    seen = {}
+    for shard_no, chunk in enumerate(pd.read_csv(spec["csv"], chunksize=shard_size)):
+        texts, ids, metadatas = index_documents(chunk, spec, seen, model_id)
+        yield shard_no, texts, ids, metadatas
+
+
+def encode_shards(spec, build_dir, shard_size, workers, model_id):
+    skipped, encoded = 0, 0
+    in_flight = set()
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=_SPAWN, initializer=_init_worker, initargs=(model_id,)
+    ) as pool:
+        for shard_no, texts, ids, metadatas in _shards(spec, shard_size, model_id):
+            shard_path = os.path.join(build_dir, f"shard_{shard_no:05d}.npy")
+            meta_path = os.path.join(build_dir, f"shard_{shard_no:05d}.json")
+            if not os.path.exists(meta_path):
+                with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+                    json.dump({"ids": ids, "metadatas": metadatas, "texts": texts}, f)
+                os.replace(meta_path + ".tmp", meta_path)
+            if os.path.exists(shard_path):
+                skipped += 1
+                continue
+            # Bound the number of shards held in memory while streaming
+            if len(in_flight) >= 2 * workers:
+                finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+                encoded += _report(spec, finished)
+            in_flight.add(pool.submit(_encode_shard, shard_path, texts))
+        finished, _ = wait(in_flight)
+        encoded += _report(spec, finished)
+    print(f"[{spec['name']}] {encoded} shards encoded, {skipped} resumed from checkpoints.")
+
+
+def _report(spec, finished):
+    for fut in finished:
+        print(f"[{spec['name']}] {os.path.basename(fut.result())} done.")
+    return len(finished)
+
+
+def write_index(spec, build_dir):
+    """Writes all checkpointed shards into a new Chroma directory and swaps it into place."""
+    from langchain_chroma import Chroma
+
+    persist_dir = spec["persist_dir"]
+    tmp_dir = persist_dir + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    db = Chroma(persist_directory=tmp_dir)
+
+    shard_files = sorted(f for f in os.listdir(build_dir) if f.startswith("shard_") and f.endswith(".json"))
+    total = 0
+    for meta_file in shard_files:
+        with open(os.path.join(build_dir, meta_file), encoding="utf-8") as f:
+            meta = json.load(f)
+        vectors = np.load(os.path.join(build_dir, meta_file[:-5] + ".npy"))
+        for start in range(0, len(meta["ids"]), WRITE_BATCH_SIZE):
+            end = start + WRITE_BATCH_SIZE
+            db._collection.upsert(
+                ids=meta["ids"][start:end],
+                embeddings=vectors[start:end].tolist(),
+                metadatas=meta["metadatas"][start:end],
+                documents=meta["texts"][start:end],
+            )
+        total += len(meta["ids"])
+    del db
+
+    old_dir = persist_dir + ".old"
+    shutil.rmtree(old_dir, ignore_errors=True)
+    if os.path.exists(persist_dir):
+        os.replace(persist_dir, old_dir)
+    os.replace(tmp_dir, persist_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    print(f"[{spec['name']}] Wrote {total} items to {persist_dir}.")
+
+
+def write_numpy_index(spec, build_dir):
+    """Concatenates all checkpointed shards into a NumPy index directory."""
+    from src.backend.vector_index import NumpyVectorIndex
+
+    ids, metadatas, vectors = [], [], []
+    shard_files = sorted(f for f in os.listdir(build_dir) if f.startswith("shard_") and f.endswith(".json"))
+    for meta_file in shard_files:
+        with open(os.path.join(build_dir, meta_file), encoding="utf-8") as f:
+            meta = json.load(f)
+        ids.extend(meta["ids"])
+        metadatas.extend(meta["metadatas"])
+        vectors.append(np.load(os.path.join(build_dir, meta_file[:-5] + ".npy")))
+    NumpyVectorIndex.save(spec["vectors_dir"], ids, metadatas, np.vstack(vectors))
+    print(f"[{spec['name']}] Wrote {len(ids)} items to {spec['vectors_dir']}.")
+
+
+def build(spec, workers, shard_size, model_id, fresh=False, backend="chroma"):
+    target_dir = spec["vectors_dir"] if backend == "numpy" else spec["persist_dir"]
+    build_dir = target_dir + ".build"
+    _prepare_build_dir(build_dir, _manifest(spec, shard_size, model_id), fresh)
+    encode_shards(spec, build_dir, shard_size, workers, model_id)
+    if backend == "numpy":
+        write_numpy_index(spec, build_dir)
+    else:
+        write_index(spec, build_dir)
+    shutil.rmtree(build_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the catalog vector indexes offline.")
+    parser.add_argument("--media", choices=[m.value for m in MediaType], help="Only build one catalog")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--shard-size", type=int, default=2000)
+    parser.add_argument("--fresh", action="store_true", help="Ignore existing checkpoints")
+    parser.add_argument("--backend", choices=["chroma", "numpy"], default=os.getenv("VECTOR_BACKEND", "chroma").lower())
+    args = parser.parse_args()
+
+    # Resolve the backend once (including fallbacks) so rows are stamped with the model the server will use
+    with ProcessPoolExecutor(max_workers=1, mp_context=_SPAWN) as probe:
+        model_id = probe.submit(_load_model_id).result()
+    print(f"Embedding model: {model_id}")
+    for media_type, spec in CATALOGS.items():
+        if args.media and media_type.value != args.media:
+            continue
+        build(spec, args.workers, args.shard_size, model_id, args.fresh, args.backend)
+
+
+if __name__ == "__main__":
+    main()
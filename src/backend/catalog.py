@@ -0,0 +1,132 @@
+import hashlib
+import os
+import pandas as pd
+
+from src.models.schemas import MediaType
+
+# Catalog layout (paths relative to project root)
+CATALOGS = {
+    MediaType.movie: {
+        "name": "movies",
+        "csv": "movies_with_emotion.csv",
+        "title_col": "Title",
+        "desc_col": "overview",
+        "text_col": "combined_text",
+        # Movies show the genre string in the author/director slot
+        "creator_col": "genre",
+        "genre_col": "genre",
+        "rating_col": "IMDB Rating",
+        "year_col": "releaseyear",
+        "descriptions_csv": "movies_descriptions.csv",
+        "persist_dir": "movies_chroma_db",
+        "vectors_dir": "movies_vectors",
+    },
+    MediaType.book: {
+        "name": "books",
+        "csv": "goodbooks_with_emotion.csv",
+        "title_col": "title",
+        "desc_col": "description",
+        "text_col": "tagged_discription",
+        "creator_col": "authors",
+        "genre_col": "categories",
+        "rating_col": "average_rating",
+        "year_col": "published_year",
+        "descriptions_csv": "books_descriptions.csv",
+        "persist_dir": "books_chroma_db",
+        "vectors_dir": "books_vectors",
+    },
+}
+
+# Descriptions shorter than this get a Wikipedia fallback
+MIN_DESC_LEN = 150
+
+
+def needs_description(desc) -> bool:
+    return pd.isna(desc) or len(str(desc).strip()) < MIN_DESC_LEN
+
+
+def load_description_backfill(path):
+    """Loads the sidecar written by backfill_descriptions.py as {title: description or None}."""
+    if not os.path.exists(path):
+        return {}
+    side = pd.read_csv(path, dtype={"title": str, "description": str}, keep_default_na=False)
+    return {t: (d or None) for t, d in zip(side["title"], side["description"])}
+
+
+def merge_description_backfill(df, spec):
+    """Fills short descriptions from the backfill sidecar.
+
+    Adds a `desc_backfilled` column: True for every row the backfill already looked up
+    (including misses), so the request path can skip Wikipedia for it.
+    """
+    backfill = load_description_backfill(spec["descriptions_csv"])
+    title_col, desc_col = spec["title_col"], spec["desc_col"]
+    if desc_col not in df.columns:
+        df[desc_col] = None
+    titles = df[title_col].astype(str)
+    df["desc_backfilled"] = titles.isin(backfill.keys())
+    if backfill:
+        replacement = titles.map(backfill)
+        use = df["desc_backfilled"] & replacement.notna() & df[desc_col].apply(needs_description)
+        df.loc[use, desc_col] = replacement[use]
+        print(f"Merged {int(use.sum())} backfilled descriptions into {spec['name']}.")
+    return df
+
+
+def item_ids(df, spec, seen=None):
+    """Stable per-row item ids: catalog name + title hash + occurrence of that title.
+
+    Ids survive edits to a row's content and inserts/deletes elsewhere in the CSV.
+    Pass the same `seen` dict across chunks when streaming a CSV in pieces.
+    """
+    seen = {} if seen is None else seen
+    ids = []
+    for t in df[spec["title_col"]].astype(str):
+        n = seen.get(t, 0)
+        seen[t] = n + 1
+        ids.append(f"{spec['name']}:{hashlib.sha1(t.encode('utf-8')).hexdigest()[:16]}:{n}")
+    return ids
+
+
+def content_hashes(texts, model_id=""):
+    """Per-row hash of the embedded text and the model that embeds it, so switching
+    embedding backends invalidates every stored vector."""
+    prefix = f"{model_id}\n" if model_id else ""
+    return [hashlib.sha1((prefix + t).encode("utf-8")).hexdigest()[:16] for t in texts]
+
+
+def index_documents(df, spec, seen=None, model_id=""):
+    """Texts, ids and metadata for every catalog row, as stored in the vector index.
+    `model_id` is embedding_model_id() of the embedder the vectors come from."""
+    texts = df[spec["text_col"]].fillna("").astype(str).tolist()
+    ids = item_ids(df, spec, seen)
+    hashes = content_hashes(texts, model_id)
+    metadatas = [
+        {"title": str(t), "item_id": i, "content_hash": h, "embedding_model": model_id}
+        for t, i, h in zip(df[spec["title_col"]].tolist(), ids, hashes)
+    ]
+    return texts, ids, metadatas
+
+
+def split_genres(value):
+    """'Drama|Crime', 'Drama, Crime' or "['Fiction']" -> ['Drama', 'Crime'] / ['Fiction']."""
+    if pd.isna(value) or str(value).strip() in ("", "Unknown"):
+        return []
+    clean = str(value).replace("|", ",").replace("[", "").replace("]", "").replace("'", "").replace('"', "")
+    return [g.strip() for g in clean.split(",") if g.strip()]
+
+
+def _column(df, col, default=None):
+    return df[col] if col in df.columns else pd.Series(default, index=df.index)
+
+
+def add_response_fields(df, spec):
+    """Precomputes the normalized RecommendationItem fields once per catalog (resp_* columns)."""
+    creator = _column(df, spec["creator_col"])
+    df["resp_creator"] = creator.where(creator.notna(), "Unknown").astype(str)
+    df["resp_genres"] = _column(df, spec["genre_col"]).apply(split_genres)
+    df["resp_rating"] = pd.to_numeric(_column(df, spec["rating_col"]), errors="coerce").fillna(0.0).astype(float)
+    df["resp_year"] = pd.to_numeric(_column(df, spec["year_col"]), errors="coerce").fillna(0).astype(int)
+    thumb = _column(df, "large_thumbnail")
+    df["resp_thumbnail"] = thumb.where(thumb.notna() & (thumb.astype(str) != ""), "cover_image.jpeg").astype(str)
+    return df
@@ -0,0 +1,252 @@
+"""Pluggable sentence-embedding backends for all-MiniLM-L6-v2.
+
+Backends (select with EMBEDDING_BACKEND):
+    torch     - sentence-transformers via HuggingFaceEmbeddings (original path)
+    onnx      - ONNX Runtime, fp32 graph (mini-lm-l6-v2-local/onnx/model.onnx)
+    onnx-int8 - ONNX Runtime, int8 graph picked for this CPU's instruction set
+    openvino  - OpenVINO, fp32 IR (mini-lm-l6-v2-local/openvino/openvino_model.xml)
+    openvino-int8 - OpenVINO, int8 IR (openvino_model_qint8_quantized.xml)
+    auto      - onnx-int8 when onnxruntime and the local model files are available, else torch
+
+All backends load from mini-lm-l6-v2-local when possible and return mean-pooled,
+L2-normalized 384-d vectors, matching the sentence-transformers pipeline
+(Transformer -> Pooling(mean) -> Normalize).
+"""
+import os
+import platform
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+# Paths (Relative to project root)
+LOCAL_MODEL_DIR = "mini-lm-l6-v2-local"
+HUB_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+MAX_SEQ_LENGTH = 256  # from sentence_bert_config.json
+
+EMBEDDING_BACKEND = os.getenv("EMBEDDING_BACKEND", "auto").lower()
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", "64"))
+# EMBEDDING_THREADS (optional) caps per-process inference threads, e.g. 1 per worker in build_index.py
+
+
+def _is_real_file(path):
+    """False for missing files and for Git LFS pointer stubs (a few hundred bytes)."""
+    return os.path.isfile(path) and os.path.getsize(path) > 1024
+
+
+def cpu_flags():
+    try:
+        with open("/proc/cpuinfo") as f:
+            for line in f:
+                if line.startswith("flags"):
+                    return set(line.split(":", 1)[1].split())
+    except OSError:
+        pass
+    return set()
+
+
+def select_int8_variant():
+    """Picks the quantized ONNX graph matching this CPU's instruction set."""
+    machine = platform.machine().lower()
+    if machine in ("arm64", "aarch64"):
+        return "model_qint8_arm64.onnx"
+    flags = cpu_flags()
+    if "avx512_vnni" in flags or "avx512vnni" in flags:
+        return "model_qint8_avx512_vnni.onnx"
+    if "avx512f" in flags and "avx512bw" in flags:
+        return "model_qint8_avx512.onnx"
+    if "avx2" in flags:
+        return "model_quint8_avx2.onnx"
+    return None
+
+
+def mean_pool_normalize(token_embeddings, attention_mask):
+    mask = attention_mask[..., None].astype(np.float32)
+    summed = (token_embeddings * mask).sum(axis=1)
+    counts = np.clip(mask.sum(axis=1), 1e-9, None)
+    pooled = summed / counts
+    norms = np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    return (pooled / norms).astype(np.float32)
+
+
+class OnnxEmbeddings(Embeddings):
+    """MiniLM sentence embeddings on ONNX Runtime (CPU)."""
+
+    def __init__(self, model_file: str, model_dir: str = LOCAL_MODEL_DIR, batch_size: int = EMBEDDING_BATCH_SIZE):
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        self.model_path = os.path.join(model_dir, "onnx", model_file)
+        self.model_id = f"onnx/{model_file}"
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if os.getenv("EMBEDDING_THREADS"):
+            options.intra_op_num_threads = int(os.getenv("EMBEDDING_THREADS"))
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+
+    def _encode(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        token_embeddings = self.session.run(None, feeds)[0]
+        return mean_pool_normalize(token_embeddings, attention_mask)
+
+    def encode(self, texts) -> np.ndarray:
+        texts = [str(t) for t in texts]
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        return np.vstack([self._encode(texts[i:i + self.batch_size]) for i in range(0, len(texts), self.batch_size)])
+
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        return self._encode([str(text)])[0].tolist()
+
+
+class OpenVINOEmbeddings(Embeddings):
+    """MiniLM sentence embeddings on OpenVINO (CPU).
+
+    The IR is compiled twice: a THROUGHPUT-hinted model driven through an async infer
+    queue for bulk catalog encoding (embed_documents), and a LATENCY-hinted model for
+    single queries (embed_query).
+    """
+
+    def __init__(self, model_file: str, model_dir: str = LOCAL_MODEL_DIR, batch_size: int = EMBEDDING_BATCH_SIZE):
+        import openvino as ov
+        from tokenizers import Tokenizer
+
+        self._ov = ov
+        self.model_path = os.path.join(model_dir, "openvino", model_file)
+        self.model_id = f"openvino/{model_file}"
+        self.batch_size = batch_size
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding(pad_id=0, pad_token="[PAD]")
+
+        core = ov.Core()
+        model = core.read_model(self.model_path)
+        self.input_names = {port.get_any_name() for port in model.inputs}
+        throughput_config = {"PERFORMANCE_HINT": "THROUGHPUT"}
+        if os.getenv("EMBEDDING_THREADS"):
+            throughput_config["INFERENCE_NUM_THREADS"] = int(os.getenv("EMBEDDING_THREADS"))
+        self.throughput_model = core.compile_model(model, "CPU", throughput_config)
+        self.latency_model = core.compile_model(model, "CPU", {"PERFORMANCE_HINT": "LATENCY"})
+        self.latency_request = self.latency_model.create_infer_request()
+        self.num_requests = self.throughput_model.get_property("OPTIMAL_NUMBER_OF_INFER_REQUESTS")
+
+    def _feeds(self, texts):
+        encodings = self.tokenizer.encode_batch(texts)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {
+            "input_ids": np.array([e.ids for e in encodings], dtype=np.int64),
+            "attention_mask": attention_mask,
+        }
+        if "token_type_ids" in self.input_names:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+        return feeds, attention_mask
+
+    def encode(self, texts) -> np.ndarray:
+        """Bulk encoding on the throughput-mode model, keeping all infer requests busy."""
+        texts = [str(t) for t in texts]
+        if not texts:
+            return np.zeros((0, 384), dtype=np.float32)
+        batches = [texts[i:i + self.batch_size] for i in range(0, len(texts), self.batch_size)]
+        results = [None] * len(batches)
+
+        def on_done(request, userdata):
+            idx, attention_mask = userdata
+            results[idx] = mean_pool_normalize(request.get_output_tensor(0).data.copy(), attention_mask)
+
+        queue = self._ov.AsyncInferQueue(self.throughput_model, self.num_requests)
+        queue.set_callback(on_done)
+        for idx, batch in enumerate(batches):
+            feeds, attention_mask = self._feeds(batch)
+            queue.start_async(feeds, (idx, attention_mask))
+        queue.wait_all()
+        return np.vstack(results)
+
+    def embed_documents(self, texts):
+        return self.encode(texts).tolist()
+
+    def embed_query(self, text):
+        feeds, attention_mask = self._feeds([str(text)])
+        output = self.latency_request.infer(feeds)[self.latency_model.output(0)]
+        return mean_pool_normalize(output, attention_mask)[0].tolist()
+
+
+def embedding_model_id(embedder) -> str:
+    """Identifies which backend/model file produces an embedder's vectors (int8 and fp32
+    vectors are not interchangeable). Stored with every index row, see catalog.index_documents."""
+    return getattr(embedder, "model_id", None) or f"torch/{HUB_MODEL_NAME}"
+
+
+OPENVINO_FILES = {
+    "openvino": "openvino_model.xml",
+    "openvino-int8": "openvino_model_qint8_quantized.xml",
+}
+
+
+def _onnx_file_for(backend):
+    if backend == "onnx":
+        return "model.onnx"
+    return select_int8_variant() or "model.onnx"
+
+
+def load_embeddings(backend: str = EMBEDDING_BACKEND, model_dir: str = LOCAL_MODEL_DIR):
+    """Builds the embedding function for the requested backend, falling back to torch when unavailable."""
+    if backend == "auto":
+        backend = "onnx-int8"
+
+    if backend in ("onnx", "onnx-int8"):
+        model_file = _onnx_file_for(backend)
+        path = os.path.join(model_dir, "onnx", model_file)
+        if _is_real_file(path) and _is_real_file(os.path.join(model_dir, "tokenizer.json")):
+            try:
+                embeddings = OnnxEmbeddings(model_file, model_dir)
+                print(f"Embedding backend: ONNX Runtime ({model_file})")
+                return embeddings
+            except ImportError as e:
+                print(f"ONNX Runtime unavailable ({e}), falling back to torch.")
+            except Exception as e:
+                print(f"Failed to load ONNX model {path} ({e}), falling back to torch.")
+        else:
+            print(f"ONNX model {path} not available locally, falling back to torch.")
+
+    if backend in OPENVINO_FILES:
+        model_file = OPENVINO_FILES[backend]
+        path = os.path.join(model_dir, "openvino", model_file)
+        if _is_real_file(path) and _is_real_file(path[:-4] + ".bin"):
+            try:
+                embeddings = OpenVINOEmbeddings(model_file, model_dir)
+                print(f"Embedding backend: OpenVINO ({model_file})")
+                return embeddings
+            except ImportError as e:
+                print(f"OpenVINO unavailable ({e}), falling back to torch.")
+            except Exception as e:
+                print(f"Failed to load OpenVINO model {path} ({e}), falling back to torch.")
+        else:
+            print(f"OpenVINO model {path} not available locally, falling back to torch.")
+
+    from langchain_community.embeddings import HuggingFaceEmbeddings
+
+    if os.getenv("EMBEDDING_THREADS"):
+        import torch
+        torch.set_num_threads(int(os.getenv("EMBEDDING_THREADS")))
+
+    # Prefer the bundled copy over a hub download
+    model_name = model_dir if _is_real_file(os.path.join(model_dir, "model.safetensors")) else HUB_MODEL_NAME
+    print(f"Embedding backend: PyTorch ({model_name})")
+    return HuggingFaceEmbeddings(
+        model_name=model_name,
+        model_kwargs={"device": "cpu"},
+        encode_kwargs={"normalize_embeddings": False}
+    )
@@ -0,0 +1,50 @@
+"""Dedicated executors for blocking work called from the async FastAPI handlers.
+
+CPU_POOL - embedding, vector search, ranking (numpy / onnx / torch release the GIL)
+IO_POOL  - SQLite and other blocking I/O
+
+Sizes are set with CPU_WORKERS / IO_WORKERS.
+"""
+import asyncio
+import functools
+import itertools
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+CPU_WORKERS = int(os.getenv("CPU_WORKERS", str(os.cpu_count() or 2)))
+IO_WORKERS = int(os.getenv("IO_WORKERS", "32"))
+
+CPU_POOL = ThreadPoolExecutor(max_workers=CPU_WORKERS, thread_name_prefix="cpu")
+IO_POOL = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+
+
+async def run_cpu(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(CPU_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def run_io(fn, *args, **kwargs):
+    return await asyncio.get_running_loop().run_in_executor(IO_POOL, functools.partial(fn, *args, **kwargs))
+
+
+async def iterate_io(iterable, batch_size: int = 100):
+    """Async iteration over a blocking iterable (e.g. a SQLite cursor generator).
+
+    Items are pulled batch_size at a time on IO_POOL. A generator is closed when iteration
+    stops early, e.g. because the client disconnected from a streaming response.
+    """
+    it = iter(iterable)
+    try:
+        while True:
+            batch = await run_io(lambda: list(itertools.islice(it, batch_size)))
+            if not batch:
+                return
+            for item in batch:
+                yield item
+    finally:
+        if hasattr(it, "close"):
+            it.close()
+
+
+def shutdown():
+    CPU_POOL.shutdown(wait=False, cancel_futures=True)
+    IO_POOL.shutdown(wait=True)
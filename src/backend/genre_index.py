@@ -0,0 +1,38 @@
+import numpy as np
+
+
+class GenreIndex:
+    """Inverted index from genre token to a packed row-id bitmap for one catalog.
+
+    Tokens are the lowercased entries of each row's genre list, so matching is on
+    exact genre tokens ("drama" does not match "melodrama"). Excluding any number of
+    genres is a bitmap union plus one unpack, independent of candidate count.
+    """
+
+    def __init__(self, genre_lists):
+        self.n_rows = len(genre_lists)
+        self.vocab = {}
+        postings = []
+        for row, genres in enumerate(genre_lists):
+            for genre in genres:
+                gid = self.vocab.setdefault(genre.strip().lower(), len(self.vocab))
+                if gid == len(postings):
+                    postings.append([])
+                postings[gid].append(row)
+
+        self._bitmaps = []
+        for rows in postings:
+            mask = np.zeros(self.n_rows, dtype=bool)
+            mask[rows] = True
+            self._bitmaps.append(np.packbits(mask))
+
+    def genre_id(self, genre):
+        return self.vocab.get(str(genre).strip().lower())
+
+    def mask(self, genres) -> np.ndarray:
+        """Boolean row mask: True where the row has any of the given genres."""
+        gids = [g for g in (self.genre_id(genre) for genre in genres) if g is not None]
+        if not gids:
+            return np.zeros(self.n_rows, dtype=bool)
+        union = np.bitwise_or.reduce([self._bitmaps[g] for g in gids])
+        return np.unpackbits(union, count=self.n_rows).astype(bool)
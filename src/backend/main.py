@@ -1,16 +1,24 @@
-from fastapi import FastAPI, HTTPException, Depends, status
+from fastapi import FastAPI, HTTPException, Depends, Query, status
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
+from typing import List, Literal, Optional
 import os
 import sys
+import json
 
 # Add project root to path to allow imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
 
 from src.database.db_manager import DatabaseManager
+from src.database.log_writer import InteractionLogWriter
 from src.backend.recommender import RecommenderSystem
-from src.models.schemas import UserQuery, AgentResponse, RecommendationItem
+from src.backend.startup import ComponentNotReadyError
+from src.backend.pagination import CursorExpiredError, decode_keyset_cursor, encode_keyset_cursor
+from src.backend import executors
+from src.backend.executors import iterate_io, run_io
+from src.models.schemas import UserQuery, AgentResponse, RecommendationItem, MediaType
 
 app = FastAPI(title="AI Agent API")
 
@@ -25,14 +33,23 @@ app.add_middleware(
 
 # Initialize Components
 db = DatabaseManager()
-# Initialize Recommender lazily or on startup? 
-# Recommender takes time to load models, so let's do it on startup but handle global var
+# Interaction logs are written in batches by a background thread, off the request path
+log_writer = InteractionLogWriter(db)
+# Recommender models and catalogs load in the background; each media type starts
+# serving as soon as its own components are ready (see /readyz)
 recommender = None
 
 @app.on_event("startup")
 async def startup_event():
     global recommender
-    recommender = RecommenderSystem()
+    recommender = RecommenderSystem(background=True)
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    log_writer.close()
+    executors.shutdown()
+    # After the writer and the I/O pool have finished with their connections
+    db.close()
 
 # --- Auth Models ---
 class LoginRequest(BaseModel):
@@ -54,32 +71,47 @@ class ProfileRequest(BaseModel):
     item_value: str
     category: str
 
+class PreferenceOperation(BaseModel):
+    action: Literal["add", "remove"]
+    preference_type: str # FAVORITE, DISLIKE, WISHLIST, WATCHED
+    item_value: str
+    category: Optional[str] = None
+
+class BulkPreferenceRequest(BaseModel):
+    user_id: int
+    operations: List[PreferenceOperation]
+
 class UpdateProfileRequest(BaseModel):
     user_id: int
     full_name: str | None = None
     email: str | None = None
     profile_image: str | None = None
 
+# --- Helpers ---
+def not_ready(e: ComponentNotReadyError):
+    """503 for a request whose media type is still loading (see /readyz)."""
+    return HTTPException(status_code=503, detail=f"System initializing... {e}", headers={"Retry-After": "5"})
+
 # --- Endpoints ---
 
 @app.post("/check_username")
 async def check_username_availability(req: CheckUsernameRequest):
-    is_available = db.check_username(req.username)
+    is_available = await run_io(db.check_username, req.username)
     return {"available": is_available}
 
 @app.post("/register")
 async def register(req: RegisterRequest):
-    user_id = db.register_user(req.username, req.password, req.email, req.full_name)
+    user_id = await run_io(db.register_user, req.username, req.password, req.email, req.full_name)
     if not user_id:
         raise HTTPException(status_code=400, detail="Username already exists")
     
     # Auto-login after register
-    user = db.authenticate_user(req.username, req.password)
+    user = await run_io(db.authenticate_user, req.username, req.password)
     return {"message": "Registered successfully", "user": user}
 
 @app.post("/login")
 async def login(req: LoginRequest):
-    user = db.authenticate_user(req.username, req.password)
+    user = await run_io(db.authenticate_user, req.username, req.password)
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     return user
@@ -93,34 +125,89 @@ async def chat(query: UserQuery):
     
     try:
         # 1. Get Recommendations
-        response = recommender.get_recommendations(query)
+        response = await recommender.aget_recommendations(query)
         print(f"DEBUG: Recommendation Count: {len(response.recommendations)}")
         
-        # 2. Log Interaction (if logged in)
-        if query.user_id:
-            db.log_interaction(
+        # 2. Log Interaction (if logged in, once per search rather than per page)
+        if query.user_id and not query.cursor:
+            record = dict(
                 user_id=query.user_id,
                 query_text=query.query_text,
                 tone=query.tone.value,
                 media_type=query.media_type.value,
                 agent_response=response.agent_message,
-                recommendations=[r.dict() for r in response.recommendations]
+                item_ids=[r.item_id for r in response.recommendations],
+                scores=[r.score for r in response.recommendations]
             )
+            # Only wait (off the loop) when the writer is backed up
+            if not log_writer.try_submit(record):
+                await run_io(log_writer.submit, record)
         
         return response
+    except ComponentNotReadyError as e:
+        raise not_ready(e)
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=410, detail=str(e))
     except Exception as e:
         print(f"DEBUG: Error in chat endpoint: {e}")
         import traceback
         traceback.print_exc()
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat/stream")
+async def chat_stream(query: UserQuery):
+    """Same as /chat, streamed as NDJSON events (see RecommenderSystem.astream_recommendations)."""
+    if not recommender:
+        raise HTTPException(status_code=503, detail="System initializing...")
+    try:
+        recommender.require_media(query.media_type)
+    except ComponentNotReadyError as e:
+        raise not_ready(e)
+
+    async def events():
+        items, agent_message = [], ""
+        try:
+            async for event in recommender.astream_recommendations(query):
+                if event["event"] == "message":
+                    agent_message = event["agent_message"]
+                elif event["event"] == "item":
+                    items.append((event["rank"], event["item"]))
+                yield json.dumps(event) + "\n"
+        except CursorExpiredError as e:
+            yield json.dumps({"event": "error", "status": 410, "detail": str(e)}) + "\n"
+            return
+        except Exception as e:
+            print(f"DEBUG: Error in chat stream: {e}")
+            yield json.dumps({"event": "error", "status": 500, "detail": str(e)}) + "\n"
+            return
+
+        # Log Interaction (if logged in) once the full list has been sent
+        if query.user_id and not query.cursor:
+            ranked = sorted(items, key=lambda x: x[0])
+            record = dict(
+                user_id=query.user_id,
+                query_text=query.query_text,
+                tone=query.tone.value,
+                media_type=query.media_type.value,
+                agent_response=agent_message,
+                item_ids=[item["item_id"] for _, item in ranked],
+                scores=[item["score"] for _, item in ranked]
+            )
+            # Only wait (off the loop) when the writer is backed up
+            if not log_writer.try_submit(record):
+                await run_io(log_writer.submit, record)
+
+    # Async generator: ranking, SQLite and Wikipedia work is awaited on the sized executors
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
 @app.get("/profile/{user_id}")
 async def get_profile(user_id: int):
-    return db.get_user_profile(user_id)
+    return await run_io(db.get_user_profile, user_id)
 
 @app.post("/update_profile")
 async def update_profile(req: UpdateProfileRequest):
-    success = db.update_user_profile(
+    success = await run_io(
+        db.update_user_profile,
         user_id=req.user_id,
         full_name=req.full_name,
         email=req.email,
@@ -132,25 +219,109 @@ async def update_profile(req: UpdateProfileRequest):
 
 @app.get("/history/{user_id}")
 async def get_history(user_id: int):
-    return db.get_chat_history(user_id)
+    return await run_io(db.get_chat_history, user_id)
+
+@app.get("/history/{user_id}/page")
+async def get_history_page(user_id: int, page_size: int = Query(20, ge=1, le=200), cursor: Optional[str] = None):
+    """Chat history newest first, one page at a time. Pass next_cursor back as cursor for older entries."""
+    try:
+        before = decode_keyset_cursor(cursor) if cursor else None
+    except CursorExpiredError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    history, next_key = await run_io(db.get_chat_history_page, user_id, page_size, before)
+    return {"history": history, "next_cursor": encode_keyset_cursor(next_key) if next_key else None}
+
+@app.get("/history/{user_id}/export")
+async def export_history(user_id: int, resolve: bool = False):
+    """Streams a user's full history as NDJSON, oldest first, one interaction per line.
+
+    Compact logs list item ids and scores; resolve=true rebuilds full items from the catalog
+    (catalog and wiki cache only, no Wikipedia calls). Rows for a media type that is still
+    loading keep their item id / score entries.
+    """
+    resolver = None
+    if resolve:
+        if not recommender:
+            raise HTTPException(status_code=503, detail="System initializing...", headers={"Retry-After": "5"})
+
+        def _resolve_row(media_type, tone, item_ids, scores):
+            if recommender.is_media_ready(MediaType(media_type)):
+                return recommender.items_for_ids(media_type, tone, item_ids, scores)
+            return [{"item_id": i, "score": s} for i, s in zip(item_ids, scores)]
+        resolver = _resolve_row
+    async def rows():
+        # Reading rows and rebuilding their items both block, so batches are pulled on the I/O pool
+        async for row in iterate_io(db.iter_interactions(user_id, resolve_items=resolver)):
+            yield json.dumps(row) + "\n"
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
 
 @app.get("/history/details/{interaction_id}")
 async def get_history_details(interaction_id: int):
-    details = db.get_interaction_details(interaction_id)
+    # Compact logs are rebuilt from the catalog once it has loaded
+    resolver = recommender.items_for_ids if recommender else None
+    try:
+        details = await run_io(db.get_interaction_details, interaction_id, resolver)
+    except ComponentNotReadyError as e:
+        raise not_ready(e)
     if not details:
         raise HTTPException(status_code=404, detail="Interaction not found")
     return details
 
 @app.post("/profile/preference")
 async def add_preference(req: ProfileRequest):
-    db.add_preference(req.user_id, req.preference_type, req.item_value, req.category)
+    await run_io(db.add_preference, req.user_id, req.preference_type, req.item_value, req.category)
+    if recommender:
+        recommender.on_preference_changed(req.user_id, req.preference_type, req.item_value, req.category)
     return {"status": "success"}
 
 @app.post("/profile/preference/remove")
 async def remove_preference(req: ProfileRequest):
-    db.remove_preference(req.user_id, req.preference_type, req.item_value)
+    await run_io(db.remove_preference, req.user_id, req.preference_type, req.item_value)
+    if recommender:
+        recommender.on_preference_changed(req.user_id, req.preference_type, req.item_value, req.category, removed=True)
     return {"status": "removed"}
 
+@app.post("/profile/preferences")
+async def apply_preferences(req: BulkPreferenceRequest):
+    """Applies many preference adds/removes in one transaction and returns the updated profile."""
+    operations = [op.dict() for op in req.operations]
+    profile = await run_io(db.apply_preference_changes, req.user_id, operations)
+    if recommender:
+        recommender.on_preferences_changed(req.user_id, operations)
+    return profile
+
+@app.get("/healthz")
+async def healthz():
+    """Liveness: the process is up and serving HTTP, whatever is still loading."""
+    return {"status": "ok"}
+
+@app.get("/readyz")
+async def readyz():
+    """Readiness: per-component load status and timings. 200 once any media type can serve /chat."""
+    if not recommender:
+        return JSONResponse(status_code=503, content={"status": "starting", "components": {}, "media": {}})
+    report = recommender.readiness()
+    statuses = [c["status"] for c in report["components"].values()]
+    if all(s == "ready" for s in statuses):
+        report["status"] = "ready"
+    elif any(report["media"].values()):
+        report["status"] = "partial"
+    else:
+        report["status"] = "failed" if "failed" in statuses else "loading"
+    return JSONResponse(status_code=200 if any(report["media"].values()) else 503, content=report)
+
+@app.get("/stats")
+async def get_stats():
+    if not recommender:
+        raise HTTPException(status_code=503, detail="System initializing...")
+    return {
+        "query_cache": recommender.query_cache.stats(),
+        "semantic_cache": recommender.semantic_cache.stats(),
+        "exclusion_masks": recommender.exclusion_masks.stats(),
+        "interaction_logs": log_writer.stats(),
+    }
+
 # Serve Frontend (Optional, if we want to serve from same port)
 # Adjust path to src/frontend
 frontend_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), "frontend_new", "dist")
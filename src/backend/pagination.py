@@ -0,0 +1,66 @@
+import base64
+import json
+import os
+import secrets
+
+from src.backend.caching import LRUCache
+
+RESULT_CURSOR_TTL = float(os.getenv("RESULT_CURSOR_TTL", "900"))  # 15 minutes
+RESULT_CURSOR_MAX = int(os.getenv("RESULT_CURSOR_MAX", "10000"))
+
+
+class CursorExpiredError(Exception):
+    """Raised when a /chat cursor is malformed, expired or belongs to another user."""
+
+
+def encode_keyset_cursor(key) -> str:
+    """Opaque cursor for a keyset position, e.g. the (timestamp, id) of the last row served."""
+    raw = json.dumps(list(key)).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_keyset_cursor(cursor: str) -> tuple:
+    """Inverse of encode_keyset_cursor. Raises CursorExpiredError if the cursor is malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+    except ValueError:
+        raise CursorExpiredError("Invalid cursor")
+    if not isinstance(key, list) or len(key) != 2:
+        raise CursorExpiredError("Invalid cursor")
+    return tuple(key)
+
+
+class ResultPageCache:
+    """Holds ranked candidate lists server-side so /chat can page through them.
+
+    Cursors are opaque url-safe tokens encoding a random result-set id and an offset.
+    Only ids and scores are stored; items are built and enriched per page on demand.
+    """
+
+    def __init__(self, ttl: float = RESULT_CURSOR_TTL, maxsize: int = RESULT_CURSOR_MAX):
+        self._results = LRUCache(maxsize=maxsize, ttl=ttl)
+
+    def cursor_for(self, results: dict, offset: int) -> str:
+        token = results.get("token")
+        if token is None:
+            token = secrets.token_urlsafe(12)
+            results["token"] = token
+            self._results.set(token, results)
+        raw = json.dumps({"t": token, "o": offset}).encode("utf-8")
+        return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+    def resolve(self, cursor: str, user_id=None):
+        """Returns (results, offset) for a cursor or raises CursorExpiredError."""
+        try:
+            padded = cursor + "=" * (-len(cursor) % 4)
+            data = json.loads(base64.urlsafe_b64decode(padded.encode("ascii")))
+            token, offset = data["t"], int(data["o"])
+        except (ValueError, KeyError, TypeError):
+            raise CursorExpiredError("Invalid cursor")
+        results = self._results.get(token)
+        if results is None or offset < 0:
+            raise CursorExpiredError("Cursor expired, please search again")
+        if results["user_id"] != user_id:
+            raise CursorExpiredError("Cursor does not belong to this user")
+        return results, offset
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import re
+import threading
+
+import numpy as np
+
+from src.backend.caching import LRUCache
+from src.database.db_manager import DatabaseManager
+
+# Bump when the enhancement prompt changes so stale rewrites are not reused
+ENHANCE_PROMPT_VERSION = "v1"
+
+QUERY_CACHE_SIZE = int(os.getenv("QUERY_CACHE_SIZE", "2048"))
+QUERY_CACHE_TTL = float(os.getenv("QUERY_CACHE_TTL", str(7 * 24 * 3600)))  # 7 days
+
+
+def normalize_query(query: str) -> str:
+    return re.sub(r"\s+", " ", query).strip().lower()
+
+
+class QueryEnhancementCache:
+    """Two-tier cache for LLM-enhanced queries: in-process LRU in front of a SQLite table.
+
+    Keyed on (normalized query, media type, model name, prompt version).
+    """
+
+    def __init__(self, db: DatabaseManager, maxsize: int = QUERY_CACHE_SIZE, ttl: float = QUERY_CACHE_TTL):
+        self.db = db
+        self.ttl = ttl
+        self._memory = LRUCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(query: str, media_type: str, model_name: str) -> str:
+        raw = "\x1f".join([normalize_query(query), media_type, model_name, ENHANCE_PROMPT_VERSION])
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def get(self, key: str):
+        enhanced = self._memory.get(key)
+        if enhanced is not None:
+            self._count("memory_hits")
+            return enhanced
+        try:
+            enhanced = self.db.get_cached_query(key, self.ttl)
+        except Exception as e:
+            print(f"Query cache read failed: {e}")
+            enhanced = None
+        if enhanced is not None:
+            self._memory.set(key, enhanced)
+            self._count("db_hits")
+            return enhanced
+        self._count("misses")
+        return None
+
+    def set(self, key: str, enhanced: str):
+        self._memory.set(key, enhanced)
+        try:
+            self.db.save_cached_query(key, enhanced)
+        except Exception as e:
+            print(f"Query cache write failed: {e}")
+
+    def purge_expired(self) -> int:
+        """Deletes `query_cache` rows past the TTL; reads skip them, but nothing else removes them."""
+        return self.db.purge_cached_queries(self.ttl)
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def stats(self):
+        lookups = self.memory_hits + self.db_hits + self.misses
+        return {
+            "memory_hits": self.memory_hits,
+            "db_hits": self.db_hits,
+            "misses": self.misses,
+            "hit_rate": round((self.memory_hits + self.db_hits) / lookups, 4) if lookups else 0.0,
+            "memory_entries": len(self._memory),
+        }
+
+
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_SIZE = int(os.getenv("SEMANTIC_CACHE_SIZE", "1000"))
+
+
+class SemanticQueryCache:
+    """Near-duplicate cache for enhanced queries.
+
+    Keeps a small in-memory matrix of unit-normalized raw-query embeddings per
+    (media type, model name, prompt version) scope and returns the enhanced text of the
+    nearest stored query when cosine similarity clears the threshold.
+    Oldest entries are overwritten once a scope is full.
+    """
+
+    def __init__(self, threshold: float = SEMANTIC_CACHE_THRESHOLD, capacity: int = SEMANTIC_CACHE_SIZE):
+        self.threshold = threshold
+        self.capacity = capacity
+        self._scopes = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _scope(media_type: str, model_name: str):
+        return (media_type, model_name, ENHANCE_PROMPT_VERSION)
+
+    @staticmethod
+    def _unit(vector):
+        vec = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vec)
+        return vec / norm if norm > 0 else vec
+
+    def lookup(self, vector, media_type: str, model_name: str):
+        """Returns (enhanced_query, similarity) for the nearest match above threshold, else None."""
+        vec = self._unit(vector)
+        with self._lock:
+            scope = self._scopes.get(self._scope(media_type, model_name))
+            if scope is None or scope["count"] == 0:
+                self.misses += 1
+                return None
+            sims = scope["vectors"][:scope["count"]] @ vec
+            best = int(np.argmax(sims))
+            if sims[best] < self.threshold:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return scope["texts"][best], float(sims[best])
+
+    def add(self, vector, enhanced: str, media_type: str, model_name: str):
+        vec = self._unit(vector)
+        with self._lock:
+            key = self._scope(media_type, model_name)
+            scope = self._scopes.get(key)
+            if scope is None:
+                scope = {
+                    "vectors": np.zeros((self.capacity, vec.shape[0]), dtype=np.float32),
+                    "texts": [None] * self.capacity,
+                    "count": 0,
+                    "next": 0,
+                }
+                self._scopes[key] = scope
+            slot = scope["next"]
+            scope["vectors"][slot] = vec
+            scope["texts"][slot] = enhanced
+            scope["next"] = (slot + 1) % self.capacity
+            scope["count"] = min(scope["count"] + 1, self.capacity)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            "threshold": self.threshold,
+            "entries": sum(s["count"] for s in self._scopes.values()),
+        }
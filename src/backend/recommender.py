@@ -1,9 +1,8 @@
 import pandas as pd
 import numpy as np
 import os
-import re
-import wikipedia
-from langchain_community.embeddings import HuggingFaceEmbeddings
+import asyncio
+import threading
 from langchain_chroma import Chroma
 from langchain_google_genai import ChatGoogleGenerativeAI
 from dotenv import load_dotenv
@@ -13,94 +12,213 @@ import shutil
 # Assumes running from project root
 from src.models.schemas import UserQuery, RecommendationItem, AgentResponse, MediaType, ToneEnum
 from src.database.db_manager import DatabaseManager
+from src.backend.embeddings import embedding_model_id, load_embeddings
+from src.backend.executors import run_cpu, run_io
+from src.backend.genre_index import GenreIndex
+from src.backend.pagination import ResultPageCache
+from src.backend.startup import StartupTracker
+from src.backend.tone_ranking import ToneRanker
+from src.backend.user_filters import ExclusionMaskCache
+from src.backend.catalog import (
+    CATALOGS, MIN_DESC_LEN, add_response_fields, index_documents, item_ids, merge_description_backfill
+)
+from src.backend.vector_index import VECTOR_BACKEND, ChromaVectorIndex, NumpyVectorIndex
+from src.backend.query_cache import QueryEnhancementCache, SemanticQueryCache
+from src.backend.wiki_enricher import WikiDescriptionFetcher, NO_DETAILS, WIKI_TIMEOUT
 
 load_dotenv()
 
+# Max documents per Chroma add/delete call
+INDEX_BATCH_SIZE = 1000
+
+# Components each media type needs before it can serve requests
+MEDIA_COMPONENTS = {
+    MediaType.movie: ("embeddings", "movie_catalog", "movie_index"),
+    MediaType.book: ("embeddings", "book_catalog", "book_index"),
+}
+
 class RecommenderSystem:
-    def __init__(self):
+    def __init__(self, background: bool = False):
+        """Loads the LLM client, embedding model and both catalogs concurrently.
+
+        With background=True the constructor returns immediately and each media type
+        becomes usable as soon as its own components are ready (see startup.py);
+        otherwise it blocks until everything has loaded.
+        """
         print("Initializing Recommender System...")
         self.api_key = os.getenv("GOOGLE_API_KEY")
         if not self.api_key:
             print("WARNING: GOOGLE_API_KEY not found in env.")
 
-        self.llm = ChatGoogleGenerativeAI(model="gemini-2.5-flash", google_api_key=self.api_key)
+        # One LLM client per model name, reused across requests
+        self._llm_clients = {}
+        self._llm_lock = threading.Lock()
         
         # Initialize Database Manager
         self.db = DatabaseManager()
+        self.wiki = WikiDescriptionFetcher(self.db)
+        self.query_cache = QueryEnhancementCache(self.db)
+        self.semantic_cache = SemanticQueryCache()
+        self.result_pages = ResultPageCache()
         
-        # Paths (Relative to project root)
-        self.model_path = "sentence-transformers/all-MiniLM-L6-v2"
-        
+        self.embedding_fn = None
+        self.genre_index = {}
+        self.title_rows = {}
+        self.tone_rankers = {}
+        self.exclusion_masks = ExclusionMaskCache()
+        self.movies_df = self.books_df = None
+        self.db_movies = self.db_books = None
+
+        # Independent steps run in parallel; each index waits only for its catalog and the embedding model
+        self.startup = StartupTracker()
+        self.startup.start([
+            ("llm", self._warm_llm, []),
+            ("cache_purge", self._purge_caches, []),
+            ("embeddings", self._load_embeddings, []),
+            ("movie_catalog", self._load_movies, []),
+            ("book_catalog", self._load_books, []),
+            ("movie_index", self._load_movie_index, ["embeddings", "movie_catalog"]),
+            ("book_index", self._load_book_index, ["embeddings", "book_catalog"]),
+        ])
+        if not background:
+            if not self.startup.wait():
+                failed = {n: c["error"] for n, c in self.startup.report()["components"].items() if c["error"]}
+                raise RuntimeError(f"Recommender System failed to load: {failed}")
+            print("Initialization Complete.")
+
+    def _warm_llm(self):
+        """Creates the default model's client ahead of the first request; _get_llm reuses it."""
+        self._get_llm("gemini-2.5-flash")
+
+    def _purge_caches(self):
+        # Expired rows are skipped on read; deleting them keeps the cache tables bounded
+        try:
+            removed = self.wiki.purge_expired() + self.query_cache.purge_expired()
+            print(f"Purged {removed} expired cache rows.")
+        except Exception as e:
+            print(f"Cache purge failed: {e}")
+
+    def _load_embeddings(self):
         print("Loading Embedding Model...")
-        self.embedding_fn = HuggingFaceEmbeddings(
-            model_name=self.model_path,
-            model_kwargs={"device": "cpu"},
-            encode_kwargs={"normalize_embeddings": False}
-        )
-        
-        print("Loading Vectors and Dataframes...")
-        # Movies
-        self.movies_df = pd.read_csv("movies_with_emotion.csv")
+        # Backend chosen by EMBEDDING_BACKEND (auto/torch/onnx/onnx-int8/openvino/openvino-int8), see embeddings.py
+        self.embedding_fn = load_embeddings()
+
+    def _load_movies(self):
+        self.movies_df = pd.read_csv(CATALOGS[MediaType.movie]["csv"])
         self._preprocess_movies()
-        self.db_movies = self._get_or_create_vector_db(
-            name="movies",
-            persist_dir="movies_chroma_db",
-            df=self.movies_df,
-            text_col="combined_text",
-            title_col="Title"
-        )
-        
-        # Books
-        self.books_df = pd.read_csv("goodbooks_with_emotion.csv")
+
+    def _load_books(self):
+        self.books_df = pd.read_csv(CATALOGS[MediaType.book]["csv"])
         self._preprocess_books()
-        self.db_books = self._get_or_create_vector_db(
-            name="books",
-            persist_dir="books_chroma_db",
-            df=self.books_df,
-            text_col="tagged_discription",
-            title_col="title"
-        )
-        print("Initialization Complete.")
 
-    def _get_or_create_vector_db(self, name, persist_dir, df, text_col, title_col):
+    def _load_movie_index(self):
+        self.db_movies = self._get_or_create_vector_db(CATALOGS[MediaType.movie], self.movies_df)
+
+    def _load_book_index(self):
+        self.db_books = self._get_or_create_vector_db(CATALOGS[MediaType.book], self.books_df)
+
+    def is_media_ready(self, media_type: MediaType) -> bool:
+        return self.startup.is_ready(*MEDIA_COMPONENTS[media_type])
+
+    def require_media(self, media_type: MediaType):
+        """Raises ComponentNotReadyError while the catalog for media_type is still loading."""
+        self.startup.require(*MEDIA_COMPONENTS[MediaType(media_type)])
+
+    def readiness(self):
+        report = self.startup.report()
+        report["media"] = {m.value: self.is_media_ready(m) for m in MEDIA_COMPONENTS}
+        return report
+
+    def _get_or_create_vector_db(self, spec, df):
+        # VECTOR_BACKEND=numpy: exact search over a memory-mapped matrix instead of Chroma
+        if VECTOR_BACKEND == "numpy":
+            index = NumpyVectorIndex.open_or_build(spec["vectors_dir"], self.embedding_fn, df, spec)
+        else:
+            index = ChromaVectorIndex(self._get_or_create_chroma_db(spec, df), self.embedding_fn)
+        # Hits resolve to DataFrame positions through their item id
+        index.attach_catalog(df["item_id"].tolist())
+        return index
+
+    def _get_or_create_chroma_db(self, spec, df):
+
+        name, persist_dir = spec["name"], spec["persist_dir"]
+        db = None
+        existing = {}
         if os.path.exists(persist_dir):
             try:
-                # Attempt to load existing DB
+                # Attempt to load existing DB and read back each item's content hash
                 db = Chroma(persist_directory=persist_dir, embedding_function=self.embedding_fn)
-                # Simple check to see if it works (checking internal collection count or similar might be better, but this implies load success)
-                # Note: Chroma() lazy loads, so we might need a real call to trigger error if file is bad
-                # But for LFS pointers, usually the __init__ or first call fails. 
-                # Let's try to get the collection object which usually triggers a DB read
-                if db._client.list_collections():
-                     print(f"Loaded existing {name} DB.")
-                     return db
+                stored = db.get(include=["metadatas"])
+                existing = {
+                    doc_id: (meta or {}).get("content_hash")
+                    for doc_id, meta in zip(stored["ids"], stored["metadatas"])
+                }
+                print(f"Loaded existing {name} DB ({len(existing)} items).")
+                stored_models = {(meta or {}).get("embedding_model") for meta in stored["metadatas"]}
+                model_id = embedding_model_id(self.embedding_fn)
+                if existing and stored_models != {model_id}:
+                    print(f"WARNING: {name} DB was embedded with {sorted(map(str, stored_models))}, "
+                          f"queries now use {model_id}. Re-embedding the catalog.")
             except Exception as e:
                 print(f"Error loading {name} DB (likely LFS pointer or corruption): {e}")
                 print(f"Removing corrupted {persist_dir} and regenerating...")
                 shutil.rmtree(persist_dir)
-        
-        print(f"Regenerating {name} DB from CSV... This may take a minute.")
-        texts = df[text_col].fillna("").astype(str).tolist()
-        metadatas = [{"title": str(t)} for t in df[title_col].tolist()]
-        
-        db = Chroma.from_texts(
-            texts=texts,
-            embedding=self.embedding_fn,
-            metadatas=metadatas,
-            persist_directory=persist_dir
-        )
-        print(f"Successfully generated {name} DB.")
+                db, existing = None, {}
+
+        if db is None:
+            print(f"Creating {name} DB from CSV... This may take a minute.")
+            db = Chroma(persist_directory=persist_dir, embedding_function=self.embedding_fn)
+
+        self._sync_vector_db(db, name, df, spec, existing)
         return db
 
+    def _sync_vector_db(self, db, name, df, spec, existing):
+        """Diffs the catalog against the index by item id + content hash and only re-embeds what changed.
+        Legacy entries without an item id / hash are treated as removed and re-added once."""
+        texts, ids, metadatas = index_documents(df, spec, model_id=embedding_model_id(self.embedding_fn))
+        current = dict(zip(ids, (m["content_hash"] for m in metadatas)))
+
+        to_delete = [doc_id for doc_id in existing if doc_id not in current]
+        to_upsert = [i for i, doc_id in enumerate(ids) if existing.get(doc_id) != current[doc_id]]
+        if not to_delete and not to_upsert:
+            print(f"{name} DB is up to date.")
+            return
+
+        print(f"Syncing {name} DB: {len(to_upsert)} added/changed, {len(to_delete)} removed.")
+        for start in range(0, len(to_delete), INDEX_BATCH_SIZE):
+            db.delete(ids=to_delete[start:start + INDEX_BATCH_SIZE])
+        for start in range(0, len(to_upsert), INDEX_BATCH_SIZE):
+            batch = to_upsert[start:start + INDEX_BATCH_SIZE]
+            db.add_texts(
+                texts=[texts[i] for i in batch],
+                metadatas=[metadatas[i] for i in batch],
+                ids=[ids[i] for i in batch]
+            )
+        print(f"Successfully synced {name} DB.")
+
+    @staticmethod
+    def _build_title_rows(df, title_col):
+        """Lowercased title -> array of row positions (titles can repeat)."""
+        lower = df[title_col].astype(str).str.lower().reset_index(drop=True)
+        return {title: np.asarray(rows, dtype=np.int64) for title, rows in lower.groupby(lower).indices.items()}
+
     def _preprocess_movies(self):
+        self.movies_df = merge_description_backfill(self.movies_df, CATALOGS[MediaType.movie])
+        self.movies_df["item_id"] = item_ids(self.movies_df, CATALOGS[MediaType.movie])
         self.movies_df["large_thumbnail"] = self.movies_df["movie_cover"].str.replace("SX300", "SX600")
         self.movies_df["large_thumbnail"] = np.where(
             self.movies_df["large_thumbnail"].isna(),
             "cover_image.jpeg",
             self.movies_df["large_thumbnail"],
         )
+        self.movies_df = add_response_fields(self.movies_df, CATALOGS[MediaType.movie])
+        self.genre_index[MediaType.movie] = GenreIndex(self.movies_df["resp_genres"].tolist())
+        self.title_rows[MediaType.movie] = self._build_title_rows(self.movies_df, "Title")
+        self.tone_rankers[MediaType.movie] = ToneRanker(self.movies_df)
 
     def _preprocess_books(self):
+        self.books_df = merge_description_backfill(self.books_df, CATALOGS[MediaType.book])
+        self.books_df["item_id"] = item_ids(self.books_df, CATALOGS[MediaType.book])
         is_google_link = self.books_df["thumbnail"].astype(str).str.contains("google.com/books")
         self.books_df["large_thumbnail"] = np.where(
             is_google_link,
@@ -112,19 +230,97 @@ class RecommenderSystem:
             "cover_image.jpeg",
             self.books_df["large_thumbnail"],
         )
+        self.books_df = add_response_fields(self.books_df, CATALOGS[MediaType.book])
+        self.genre_index[MediaType.book] = GenreIndex(self.books_df["resp_genres"].tolist())
+        self.title_rows[MediaType.book] = self._build_title_rows(self.books_df, "title")
+        self.tone_rankers[MediaType.book] = ToneRanker(self.books_df)
+
+    def _get_llm(self, model_name: str):
+        with self._llm_lock:
+            llm = self._llm_clients.get(model_name)
+            if llm is None:
+                llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=self.api_key)
+                self._llm_clients[model_name] = llm
+            return llm
+
+    def _exact_enhancement(self, query: str, media_type: MediaType, model_name: str):
+        """Exact-match cache lookup (memory, then SQLite). Returns (enhanced or None, cache_key)."""
+        cache_key = self.query_cache.make_key(query, media_type.value, model_name)
+        return self.query_cache.get(cache_key), cache_key
+
+    def _semantic_enhancement(self, query: str, media_type: MediaType, model_name: str):
+        """Embeds the query and checks the semantic cache. Returns (enhanced or None, raw query vector)."""
+        # Near-duplicate phrasing of a query we already enhanced?
+        query_vec = None
+        try:
+            query_vec = self.embedding_fn.embed_query(query)
+            match = self.semantic_cache.lookup(query_vec, media_type.value, model_name)
+            if match:
+                enhanced, similarity = match
+                print(f"Semantic cache hit (similarity {similarity:.3f})")
+                return enhanced, query_vec
+        except Exception as e:
+            print(f"Semantic cache lookup failed: {e}")
+        return None, query_vec
+
+    def _store_enhancement(self, cache_key, query_vec, enhanced: str, media_type: MediaType, model_name: str):
+        self.query_cache.set(cache_key, enhanced)
+        if query_vec is not None:
+            self.semantic_cache.add(query_vec, enhanced, media_type.value, model_name)
 
     def _enhance_query(self, query: str, media_type: MediaType, model_name: str = "gemini-2.5-flash") -> str:
+        model_name = model_name or "gemini-2.5-flash"
+        cached, cache_key = self._exact_enhancement(query, media_type, model_name)
+        if cached is not None:
+            return cached
+        similar, query_vec = self._semantic_enhancement(query, media_type, model_name)
+        if similar is not None:
+            self.query_cache.set(cache_key, similar)
+            return similar
+
+        enhanced = self._call_llm_enhance(query, media_type, model_name)
+        if enhanced is None:
+            return query
+        self._store_enhancement(cache_key, query_vec, enhanced, media_type, model_name)
+        return enhanced
+
+    async def _aenhance_query(self, query: str, media_type: MediaType, model_name: str = "gemini-2.5-flash") -> str:
+        """Async _enhance_query: the SQLite lookup runs on the I/O pool, the query embedding on the
+        CPU pool, and the LLM call uses the async client."""
+        model_name = model_name or "gemini-2.5-flash"
+        cached, cache_key = await run_io(self._exact_enhancement, query, media_type, model_name)
+        if cached is not None:
+            return cached
+        similar, query_vec = await run_cpu(self._semantic_enhancement, query, media_type, model_name)
+        if similar is not None:
+            await run_io(self.query_cache.set, cache_key, similar)
+            return similar
+
+        enhanced = await self._acall_llm_enhance(query, media_type, model_name)
+        if enhanced is None:
+            return query
+        await run_io(self._store_enhancement, cache_key, query_vec, enhanced, media_type, model_name)
+        return enhanced
+
+    @staticmethod
+    def _enhance_prompt(query: str, media_type: MediaType) -> str:
         context = "movie" if media_type == MediaType.movie else "book"
-        prompt = f"""
+        return f"""
         You are enhancing a user query for a semantic {context} recommendation system.
         Rewrite the input into a rich, reflective description that emphasizes emotions, themes, and character journeys.
         Do NOT mention specific titles or actors.
         User input: "{query}"
         Enhanced semantic query:
         """
-        
-        # Initialize specific model
-        llm = ChatGoogleGenerativeAI(model=model_name, google_api_key=self.api_key)
+
+    @staticmethod
+    def _response_text(response) -> str:
+        return response.content.strip() if hasattr(response, 'content') else str(response).strip()
+
+    def _call_llm_enhance(self, query: str, media_type: MediaType, model_name: str):
+        """Runs the Gemini rewrite. Returns None when the LLM is unavailable so callers fall back to the raw query."""
+        prompt = self._enhance_prompt(query, media_type)
+        llm = self._get_llm(model_name)
         
         try:
             # Simple fallback if rate limited:
@@ -133,179 +329,352 @@ class RecommenderSystem:
             from google.api_core.exceptions import ResourceExhausted
             
             try:
-                response = llm.invoke(prompt)
-                return response.content.strip() if hasattr(response, 'content') else str(response).strip()
+                return self._response_text(llm.invoke(prompt))
             except ResourceExhausted:
                 print("Gemini API Quota Exceeded. Using original query fallback.")
-                return query
+                return None
             except Exception:
                 # Retry once
                 time.sleep(2)
-                response = llm.invoke(prompt)
-                return response.content.strip() if hasattr(response, 'content') else str(response).strip()
+                return self._response_text(llm.invoke(prompt))
         except Exception as e:
             print(f"LLM Error (Fallback to original query): {e}")
-            return query
+            return None
 
-    def _extract_title(self, text):
-        try:
-            # Try movie pattern
-            match = re.search(r"Title:\s*(.*?)\. Year:", text)
-            if match: return match.group(1).strip()
-            # Try book pattern
-            match = re.search(r'title:\s*(.*?)(;|\s*\\Z)', text, re.IGNORECASE)
-            if match: return match.group(1).strip()
-        except:
-            pass
-        return None
-
-    def _get_wiki_desc(self, title):
+    async def _acall_llm_enhance(self, query: str, media_type: MediaType, model_name: str):
+        """Async _call_llm_enhance on the LLM client's native async API (no thread held while waiting)."""
+        prompt = self._enhance_prompt(query, media_type)
+        llm = self._get_llm(model_name)
+        
         try:
-            results = wikipedia.search(title)
-            if not results: return "No details available."
-            page = wikipedia.page(results[0], auto_suggest=False)
-            return page.summary.split(".")[0] + "."
-        except:
-            return "No details available."
+            from google.api_core.exceptions import ResourceExhausted
+            
+            try:
+                return self._response_text(await llm.ainvoke(prompt))
+            except ResourceExhausted:
+                print("Gemini API Quota Exceeded. Using original query fallback.")
+                return None
+            except Exception:
+                # Retry once
+                await asyncio.sleep(2)
+                return self._response_text(await llm.ainvoke(prompt))
+        except Exception as e:
+            print(f"LLM Error (Fallback to original query): {e}")
+            return None
 
-    def get_recommendations(self, user_query: UserQuery) -> AgentResponse:
-        media_type = user_query.media_type
+    def _local_descriptions(self, final_df, media_type):
+        """Catalog descriptions per row plus whether each row still needs a Wikipedia lookup."""
+        desc_col = CATALOGS[media_type]["desc_col"]
+        descs = [str(d).strip() if pd.notna(d) else "" for d in final_df[desc_col]]
+        # If description is missing or too short (e.g. just a blurb), try wiki.
+        # Rows the offline backfill already looked up never go to Wikipedia at request time.
+        need_wiki = [len(d) < MIN_DESC_LEN and not b for d, b in zip(descs, final_df["desc_backfilled"].tolist())]
+        return descs, need_wiki
+
+    def _title_positions(self, media_type, titles):
+        title_rows = self.title_rows[media_type]
+        rows = [title_rows[t.lower()] for t in titles if t.lower() in title_rows]
+        return np.concatenate(rows) if rows else np.array([], dtype=np.int64)
+
+    def _get_exclusion_mask(self, user_id: int, media_type: MediaType) -> np.ndarray:
+        mask = self.exclusion_masks.get(user_id, media_type)
+        if mask is not None:
+            return mask
+        generation = self.exclusion_masks.generation(user_id)
+        profile = self.db.get_user_profile(user_id)
+        mask = self.genre_index[media_type].mask(profile.get('disliked_genres', []))
+        mask[self._title_positions(media_type, profile.get('disliked_items', []) + profile.get('watched', []))] = True
+        # Dropped if a preference change committed since the generation was read
+        self.exclusion_masks.put(user_id, media_type, mask, generation)
+        return mask
+
+    def on_preference_changed(self, user_id: int, preference_type: str, item_value: str, category: str, removed: bool = False):
+        """Keeps cached exclusion masks in sync with DatabaseManager.add_preference/remove_preference."""
+        if removed:
+            # Another preference may still exclude the same rows, so rebuild on next request
+            self.exclusion_masks.invalidate(user_id)
+            return
+        for media_type in (MediaType.movie, MediaType.book):
+            if not self.is_media_ready(media_type):
+                continue  # No masks can have been cached for it yet
+            if preference_type == "DISLIKE" and category == "genre":
+                self.exclusion_masks.patch(user_id, media_type, extra_mask=self.genre_index[media_type].mask([item_value]))
+            elif preference_type in ("DISLIKE", "WATCHED"):
+                self.exclusion_masks.patch(user_id, media_type, rows=self._title_positions(media_type, [item_value]))
+
+    def on_preferences_changed(self, user_id: int, operations):
+        """Bulk counterpart of on_preference_changed for DatabaseManager.apply_preference_changes."""
+        if any(op["action"] == "remove" for op in operations):
+            self.exclusion_masks.invalidate(user_id)
+            return
+        for op in operations:
+            self.on_preference_changed(user_id, op["preference_type"], op["item_value"], op.get("category"))
+
+    def _rank(self, user_query: UserQuery):
+        """Runs enhancement, search and tone ranking. Returns (catalog positions, scores) in rank order."""
         # 1. Enhance Query
-        enhanced_q = self._enhance_query(user_query.query_text, media_type, user_query.model)
+        enhanced_q = self._enhance_query(user_query.query_text, user_query.media_type, user_query.model)
         print(f"Enhanced Query: {enhanced_q}")
+        return self._search(user_query, enhanced_q, self._user_exclusions(user_query))
 
+    def _user_exclusions(self, user_query: UserQuery):
+        """Exclusion mask for the requesting user, or None. May read the profile from SQLite."""
+        if not user_query.user_id:
+            return None
+        try:
+            return self._get_exclusion_mask(user_query.user_id, user_query.media_type)
+        except Exception as e:
+            print(f"Error applying user filters: {e}")
+            return None
+
+    def _search(self, user_query: UserQuery, enhanced_q: str, excluded=None):
+        """CPU-bound part of ranking: query embedding, filtered vector search, MMR and tone blend.
+
+        excluded: per-user exclusions (disliked/watched titles, disliked genres), pushed into the search.
+        """
+        media_type = user_query.media_type
         # 2. Vector Search
         db = self.db_movies if media_type == MediaType.movie else self.db_books
-        ref_df = self.movies_df if media_type == MediaType.movie else self.books_df
-        title_col = "Title" if media_type == MediaType.movie else "title"
-        
-        recs = db.max_marginal_relevance_search(enhanced_q, k=100, fetch_k=1000)
-        
-        found_titles = []
-        for rec in recs:
-            t = rec.metadata.get("title")
-            if not t:
-                t = self._extract_title(rec.page_content)
-            if t: found_titles.append(t)
-            
-        # 3. Filter DataFrame
-        matched_df = ref_df[ref_df[title_col].isin(found_titles)].copy()
         
-        # --- Apply User Filtering (Requirement: Remove hated/watched) ---
-        if user_query.user_id:
-            try:
-                profile = self.db.get_user_profile(user_query.user_id)
-                disliked_genres = [g.lower() for g in profile.get('disliked_genres', [])]
-                disliked_items = [i.lower() for i in profile.get('disliked_items', [])]
-                watched_items = [w.lower() for w in profile.get('watched', [])]
-                
-                # Filter out Disliked/Watched Items
-                # Normalize title for comparison
-                matched_df['lower_title'] = matched_df[title_col].astype(str).str.lower()
-                
-                # Exclude items in disliked or watched lists
-                matched_df = matched_df[~matched_df['lower_title'].isin(disliked_items + watched_items)]
-                
-                # Filter out Disliked Genres
-                if disliked_genres:
-                    genre_col = "genre" if media_type == MediaType.movie else "categories" # Check column name for books
-                    # For books it might be 'categories' or 'genre' - checking schemas or data
-                    # In goodbooks_with_emotion.csv (viewed earlier), check header: ... categories ...
-                    
-                    if genre_col in matched_df.columns:
-                        # Helper to check if any disliked genre is in the item's genre string
-                        def has_disliked_genre(item_genres):
-                            if pd.isna(item_genres): return False
-                            item_genres_lower = str(item_genres).lower()
-                            return any(dg in item_genres_lower for dg in disliked_genres)
-                            
-                        matched_df = matched_df[~matched_df[genre_col].apply(has_disliked_genre)]
-                
-                # Cleanup temp column
-                if 'lower_title' in matched_df.columns:
-                    matched_df.drop(columns=['lower_title'], inplace=True)
-                    
-            except Exception as e:
-                print(f"Error applying user filters: {e}")
-        # ----------------------------------------------------------------
+        query_vec = self.embedding_fn.embed_query(enhanced_q)
+        positions, similarities = db.search(
+            query_vec,
+            k=user_query.k,
+            fetch_k=user_query.fetch_k,
+            lambda_mult=user_query.mmr_lambda,
+            diversify=user_query.diversify,
+            exclude=excluded
+        )
         
-        # 4. Tone Sort
+        # 3. Tone: blend similarity with the precomputed per-tone rank and take the top k
+        scores = similarities
         if user_query.tone != ToneEnum.all:
-            tone_map = {
-                ToneEnum.joy: "joy", ToneEnum.surprise: "surprise",
-                ToneEnum.anger: "anger", ToneEnum.fear: "fear",
-                ToneEnum.sadness: "sadness"
-            }
-            if col := tone_map.get(user_query.tone):
-                if col in matched_df.columns:
-                    matched_df.sort_values(by=col, ascending=False, inplace=True)
-
-        # 5. Limit and Format
-        final_df = matched_df.head(100) # Return top 100
-        
-        rec_items = []
-        for _, row in final_df.iterrows():
-            # Handle descriptions
-            desc = row.get("overview") if media_type == MediaType.movie else row.get("description")
-            if pd.isna(desc) or not str(desc).strip():
-                desc = self._get_wiki_desc(row[title_col])
-            
-            # Use full description (User request: don't end with ...)
-            # If description is too short (e.g. just a blurb), try wiki
-            desc = desc if pd.notna(desc) and str(desc).strip() else ""
-            if len(desc) < 150: # Threshold for "short" description fallback
-                 wiki_desc = self._get_wiki_desc(row[title_col])
-                 if wiki_desc and wiki_desc != "No details available.":
-                     desc = wiki_desc
-            
-            # Author/Director/Genre
-            genres = []
-            if media_type == MediaType.movie:
-                creator = str(row.get("genre", "Unknown"))
-                # Split genre string if possible
-                if creator != "Unknown":
-                    genres = [g.strip() for g in creator.replace('|', ',').split(',')]
-                
-                try:
-                    rating = float(row.get("IMDB Rating", 0.0)) if pd.notna(row.get("IMDB Rating")) else 0.0
-                except:
-                    rating = 0.0
-                # Extract year from Title string "Movie (Year)" or use a year column if exists
-                # Assuming no explict Year column based on previous code usage
-                try:
-                    year = int(float(row.get("releaseyear", 0))) if pd.notna(row.get("releaseyear")) else 0
-                except:
-                    year = 0
-            else:
-                creator = str(row.get("authors", "Unknown"))
-                # Books have 'categories'
-                cats = str(row.get("categories", "Unknown"))
-                if cats != "Unknown" and pd.notna(cats):
-                     # Often formatting like ['Fiction'] or Fiction, Classics
-                     clean_cats = cats.replace("[", "").replace("]", "").replace("'", "").replace('"', "")
-                     genres = [c.strip() for c in clean_cats.split(',')]
-                
-                try:
-                    rating = float(row.get("average_rating", 0.0)) if pd.notna(row.get("average_rating")) else 0.0
-                except:
-                    rating = 0.0
-                try:
-                    year = int(float(row.get("published_year", 0))) if pd.notna(row.get("published_year")) else 0
-                except:
-                    year = 0
-                
-            rec_items.append(RecommendationItem(
-                title=str(row[title_col]),
-                author_or_director=creator,
-                description=str(desc),
-                thumbnail_url=str(row.get("large_thumbnail", "cover_image.jpeg")) or "cover_image.jpeg",
-                explanation=f"Matches your '{user_query.tone.value}' mood request.",
-                average_rating=rating,
-                year=year,
-                genres=genres
-            ))
+            order, scores = self.tone_rankers[media_type].rerank(
+                positions, similarities, user_query.tone, user_query.tone_weight, user_query.k
+            )
+            positions = positions[order]
+        return positions[:user_query.k], scores[:user_query.k]
+
+    def _page_frame(self, media_type: MediaType, positions):
+        ref_df = self.movies_df if media_type == MediaType.movie else self.books_df
+        title_col = "Title" if media_type == MediaType.movie else "title"
+        return ref_df.iloc[positions], title_col
+
+    @staticmethod
+    def _item_fields(final_df, title_col):
+        """Precomputed response columns (see add_response_fields), one tuple per row."""
+        return list(zip(
+            final_df[title_col].tolist(),
+            final_df["resp_creator"].tolist(),
+            final_df["resp_thumbnail"].tolist(),
+            final_df["resp_rating"].tolist(),
+            final_df["resp_year"].tolist(),
+            final_df["resp_genres"].tolist(),
+            final_df["item_id"].tolist(),
+        ))
 
+    @staticmethod
+    def _make_item(fields, desc, explanation, score=None) -> RecommendationItem:
+        title, creator, thumb, rating, year, genres, item_id = fields
+        return RecommendationItem(
+            title=str(title),
+            author_or_director=creator,
+            description=str(desc),
+            thumbnail_url=thumb,
+            explanation=explanation,
+            average_rating=rating,
+            year=year,
+            genres=genres,
+            item_id=item_id,
+            score=None if score is None else float(score)
+        )
+
+    def _page_parts(self, results: dict, offset: int, end: int) -> dict:
+        """Everything needed to format results[offset:end], before any Wikipedia lookup.
+        Gathering rows costs O(page size), not O(k)."""
+        media_type = results["media_type"]
+        final_df, title_col = self._page_frame(media_type, results["positions"][offset:end])
+        descs, need_wiki = self._local_descriptions(final_df, media_type)
+        return {
+            "fields": self._item_fields(final_df, title_col),
+            "descs": descs,
+            "need_wiki": need_wiki,
+            "scores": results["scores"][offset:end],
+            "explanation": f"Matches your '{results['tone'].value}' mood request.",
+        }
+
+    @staticmethod
+    def _wiki_titles(parts: dict):
+        """Titles on the page whose catalog description is too short (see _local_descriptions)."""
+        return [str(row[0]) for row, needs in zip(parts["fields"], parts["need_wiki"]) if needs]
+
+    def _page_item(self, parts: dict, i: int, wiki_desc=None) -> RecommendationItem:
+        # Use full description (User request: don't end with ...)
+        desc = (wiki_desc if parts["need_wiki"][i] else None) or parts["descs"][i] or NO_DETAILS
+        return self._make_item(parts["fields"][i], desc, parts["explanation"], parts["scores"][i])
+
+    def _assemble_items(self, parts: dict, wiki_descs: dict):
+        return [self._page_item(parts, i, wiki_descs.get(str(row[0]))) for i, row in enumerate(parts["fields"])]
+
+    def _build_items(self, results: dict, offset: int, end: int):
+        """Formats one result page, fetching short/missing descriptions from Wikipedia concurrently."""
+        parts = self._page_parts(results, offset, end)
+        titles = self._wiki_titles(parts)
+        return self._assemble_items(parts, self.wiki.get_many(titles) if titles else {})
+
+    def items_for_ids(self, media_type: str, tone: str, item_ids, scores):
+        """Rebuilds logged RecommendationItem dicts from catalog item ids (see DatabaseManager.get_interaction_details).
+
+        Replay only formats stored data: descriptions come from the catalog and the wiki
+        cache, never from a live Wikipedia lookup. Items no longer in the catalog are skipped.
+        """
+        media_type = MediaType(media_type)
+        self.require_media(media_type)
+        db = self.db_movies if media_type == MediaType.movie else self.db_books
+        found = [(db.row_of[i], s) for i, s in zip(item_ids, scores) if i in db.row_of]
+        if len(found) < len(item_ids):
+            print(f"{len(item_ids) - len(found)} logged {media_type.value} items are no longer in the catalog.")
+        if not found:
+            return []
+        positions, kept_scores = (list(x) for x in zip(*found))
+        results = {
+            "media_type": media_type,
+            "tone": ToneEnum(tone),
+            "positions": np.array(positions, dtype=np.int64),
+            "scores": kept_scores,
+        }
+        parts = self._page_parts(results, 0, len(positions))
+        wiki_descs = self.wiki.cached(self._wiki_titles(parts))
+        return [item.dict() for item in self._assemble_items(parts, wiki_descs)]
+
+    @staticmethod
+    def _agent_message(media_type: MediaType, query_text: str, tone: ToneEnum) -> str:
+        return f"I found these {media_type.value}s based on '{query_text}' with a {tone.value} tone."
+
+    @staticmethod
+    def _new_results(user_query: UserQuery, positions, scores) -> dict:
+        return {
+            "user_id": user_query.user_id,
+            "media_type": user_query.media_type,
+            "tone": user_query.tone,
+            "query_text": user_query.query_text,
+            "positions": positions,
+            "scores": scores,
+            "page_size": user_query.page_size or len(positions),
+        }
+
+    def _page_bounds(self, results: dict, offset: int, page_size: int):
+        end = offset + page_size
+        next_cursor = None
+        if end < len(results["positions"]):
+            next_cursor = self.result_pages.cursor_for(results, end)
+        return end, next_cursor
+
+    def _cursor_page(self, user_query: UserQuery):
+        """Follow-up page: reuses the ranked list held server-side under the cursor. Returns (results, offset, page_size)."""
+        results, offset = self.result_pages.resolve(user_query.cursor, user_query.user_id)
+        return results, offset, user_query.page_size or results["page_size"]
+
+    def _page(self, user_query: UserQuery):
+        """Resolves the requested result page.
+
+        Returns (results, offset, end, next_cursor) where results holds the full ranked
+        list and request context. Without page_size the page is the whole list.
+        """
+        if user_query.cursor:
+            results, offset, page_size = self._cursor_page(user_query)
+        else:
+            positions, scores = self._rank(user_query)
+            results = self._new_results(user_query, positions, scores)
+            offset, page_size = 0, results["page_size"]
+        end, next_cursor = self._page_bounds(results, offset, page_size)
+        return results, offset, end, next_cursor
+
+    async def _apage(self, user_query: UserQuery):
+        """Async _page: the LLM call is awaited natively, the user's exclusions load on the
+        I/O pool meanwhile, and ranking runs on the CPU pool."""
+        if user_query.cursor:
+            results, offset, page_size = self._cursor_page(user_query)
+        else:
+            enhanced_q, excluded = await asyncio.gather(
+                self._aenhance_query(user_query.query_text, user_query.media_type, user_query.model),
+                run_io(self._user_exclusions, user_query),
+            )
+            print(f"Enhanced Query: {enhanced_q}")
+            positions, scores = await run_cpu(self._search, user_query, enhanced_q, excluded)
+            results = self._new_results(user_query, positions, scores)
+            offset, page_size = 0, results["page_size"]
+        end, next_cursor = self._page_bounds(results, offset, page_size)
+        return results, offset, end, next_cursor
+
+    def _response(self, results: dict, items, next_cursor) -> AgentResponse:
         return AgentResponse(
-            recommendations=rec_items,
-            agent_message=f"I found these {media_type.value}s based on '{user_query.query_text}' with a {user_query.tone.value} tone."
+            recommendations=items,
+            agent_message=self._agent_message(results["media_type"], results["query_text"], results["tone"]),
+            next_cursor=next_cursor
         )
+
+    def get_recommendations(self, user_query: UserQuery) -> AgentResponse:
+        self.require_media(user_query.media_type)
+        results, offset, end, next_cursor = self._page(user_query)
+        # Only the requested page is gathered and enriched
+        return self._response(results, self._build_items(results, offset, end), next_cursor)
+
+    async def aget_recommendations(self, user_query: UserQuery) -> AgentResponse:
+        """Event-loop friendly get_recommendations: identical except that ranking and the
+        Wikipedia lookups are awaited instead of blocking."""
+        self.require_media(user_query.media_type)
+        results, offset, end, next_cursor = await self._apage(user_query)
+        parts = self._page_parts(results, offset, end)
+        titles = self._wiki_titles(parts)
+        wiki_descs = await self.wiki.aget_many(titles) if titles else {}
+        return self._response(results, self._assemble_items(parts, wiki_descs), next_cursor)
+
+    async def astream_recommendations(self, user_query: UserQuery):
+        """Async generator of progress events, then each RecommendationItem as soon as its description is ready.
+
+        Events: {"event": "stage"}, {"event": "message"}, {"event": "item", "rank": i, "item": {...}},
+        and a final {"event": "done"}. Items with a catalog description come first; items
+        waiting on Wikipedia follow as their lookups complete, so clients should order by rank.
+        """
+        self.require_media(user_query.media_type)
+        yield {"event": "stage", "stage": "ranking"}
+        results, offset, end, next_cursor = await self._apage(user_query)
+        media_type, tone = results["media_type"], results["tone"]
+        yield {
+            "event": "message",
+            "agent_message": self._agent_message(media_type, results["query_text"], tone),
+            "count": len(results["positions"][offset:end]),
+        }
+
+        yield {"event": "stage", "stage": "enriching"}
+        parts = self._page_parts(results, offset, end)
+
+        waiting = {}
+        for i, (row, needs) in enumerate(zip(parts["fields"], parts["need_wiki"])):
+            if needs:
+                waiting.setdefault(str(row[0]), []).append(i)
+            else:
+                yield {"event": "item", "rank": offset + i, "item": self._page_item(parts, i).dict()}
+
+        if waiting:
+            # Cache lookups hit SQLite, so resolve them on the I/O pool; fetches run on the wiki pool
+            futures = await run_io(self.wiki.futures, list(waiting))
+            pending = {asyncio.wrap_future(fut): title for title, fut in futures.items()}
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + WIKI_TIMEOUT
+            while pending:
+                done, _ = await asyncio.wait(
+                    pending, timeout=max(deadline - loop.time(), 0), return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    break
+                for fut in done:
+                    for i in waiting.pop(pending.pop(fut)):
+                        yield {"event": "item", "rank": offset + i, "item": self._page_item(parts, i, fut.result()).dict()}
+            # Lookups that timed out fall back to the catalog text
+            for indices in waiting.values():
+                for i in indices:
+                    yield {"event": "item", "rank": offset + i, "item": self._page_item(parts, i).dict()}
+
+        yield {"event": "done", "next_cursor": next_cursor}
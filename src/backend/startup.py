@@ -0,0 +1,84 @@
+"""Concurrent, dependency-aware loading of the RecommenderSystem's components.
+
+Each component is a named load step that may depend on others. Every step gets its
+own thread, waits only for its own dependencies, and records its status and timing so
+/readyz can report progress while the rest is still loading.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+PENDING, LOADING, READY, FAILED = "pending", "loading", "ready", "failed"
+
+
+class ComponentNotReadyError(Exception):
+    """Raised when a request needs a component that has not finished loading."""
+
+
+class StartupTracker:
+    """Runs load steps concurrently and tracks per-component readiness and load times."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._status = {}
+        self._futures = {}
+        self._started_at = time.time()
+
+    def start(self, steps):
+        """steps: list of (name, fn, dependency names). Dependencies must be listed first."""
+        pool = ThreadPoolExecutor(max_workers=max(len(steps), 1), thread_name_prefix="startup")
+        for name, fn, deps in steps:
+            with self._lock:
+                self._status[name] = {"status": PENDING, "seconds": None, "error": None}
+            self._futures[name] = pool.submit(self._run, name, fn, [self._futures[d] for d in deps])
+        # Already submitted steps keep running; the threads exit once they are done
+        pool.shutdown(wait=False)
+
+    def _run(self, name, fn, deps):
+        wait(deps)
+        failed = [f for f in deps if f.exception() is not None]
+        if failed:
+            self._set(name, FAILED, error=f"dependency failed: {failed[0].exception()}")
+            raise failed[0].exception()
+
+        self._set(name, LOADING)
+        start = time.perf_counter()
+        try:
+            fn()
+        except Exception as e:
+            print(f"Startup: {name} failed after {time.perf_counter() - start:.1f}s: {e}")
+            self._set(name, FAILED, seconds=time.perf_counter() - start, error=str(e))
+            raise
+        elapsed = time.perf_counter() - start
+        print(f"Startup: {name} ready in {elapsed:.1f}s")
+        self._set(name, READY, seconds=elapsed)
+
+    def _set(self, name, status, seconds=None, error=None):
+        with self._lock:
+            self._status[name] = {
+                "status": status,
+                "seconds": None if seconds is None else round(seconds, 3),
+                "error": error,
+            }
+
+    def is_ready(self, *names) -> bool:
+        with self._lock:
+            return all(self._status.get(n, {}).get("status") == READY for n in names)
+
+    def require(self, *names):
+        """Raises ComponentNotReadyError unless all named components are ready."""
+        if not self.is_ready(*names):
+            raise ComponentNotReadyError(f"Not ready: {', '.join(n for n in names if not self.is_ready(n))}")
+
+    def wait(self, timeout=None) -> bool:
+        """Blocks until every step has finished. Returns False if any failed."""
+        done, _ = wait(list(self._futures.values()), timeout=timeout)
+        return len(done) == len(self._futures) and all(f.exception() is None for f in done)
+
+    def report(self):
+        with self._lock:
+            components = {name: dict(s) for name, s in self._status.items()}
+        return {
+            "uptime_seconds": round(time.time() - self._started_at, 3),
+            "components": components,
+        }
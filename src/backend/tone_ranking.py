@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from src.models.schemas import ToneEnum
+
+# Emotion score columns in both catalogs, in matrix column order
+EMOTION_COLUMNS = ["joy", "surprise", "anger", "fear", "sadness"]
+
+TONE_COLUMNS = {
+    ToneEnum.joy: "joy", ToneEnum.surprise: "surprise",
+    ToneEnum.anger: "anger", ToneEnum.fear: "fear",
+    ToneEnum.sadness: "sadness"
+}
+
+
+class ToneRanker:
+    """Emotion ranks for one catalog, precomputed for tone-aware re-ranking.
+
+    Holds, per tone, each row's global rank by that emotion score as a float32 matrix,
+    normalized to [0, 1] (1 = most joyful / fearful / ...). A tone request
+    blends the candidates' query similarity with their tone rank and picks the top k
+    with argpartition; no DataFrame sort is involved.
+    """
+
+    def __init__(self, df):
+        n = len(df)
+        self.ranks = np.zeros((n, len(EMOTION_COLUMNS)), dtype=np.float32)
+        for j, col in enumerate(EMOTION_COLUMNS):
+            if col not in df.columns:
+                continue
+            values = pd.to_numeric(df[col], errors="coerce").fillna(0.0).to_numpy(dtype=np.float32)
+            order = np.argsort(values, kind="stable")
+            self.ranks[order, j] = np.arange(n, dtype=np.float32) / max(n - 1, 1)
+
+    def rerank(self, positions, similarities, tone: ToneEnum, weight: float, k: int):
+        """Returns (order into positions, blended scores) for the best k candidates."""
+        col = TONE_COLUMNS.get(tone)
+        if col is None or not len(positions):
+            order = np.arange(min(k, len(positions)))
+            return order, similarities[order]
+        tone_rank = self.ranks[positions, EMOTION_COLUMNS.index(col)]
+        blended = (1.0 - weight) * similarities + weight * tone_rank
+        k = min(k, len(positions))
+        top = np.argpartition(-blended, k - 1)[:k]
+        top = top[np.argsort(-blended[top], kind="stable")]
+        return top, blended[top]
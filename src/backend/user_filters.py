@@ -0,0 +1,92 @@
+import os
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+EXCLUSION_CACHE_MB = float(os.getenv("EXCLUSION_CACHE_MB", "64"))
+
+
+class ExclusionMaskCache:
+    """Per-(user, media type) boolean masks over catalog rows (True = exclude).
+
+    LRU-evicted by total mask bytes rather than entry count, so heavy users with
+    large catalogs cannot blow the memory budget. Masks are never mutated in place:
+    patch() swaps in a new array, so concurrent readers always see a complete mask.
+
+    Every invalidate()/patch() bumps a per-user generation. A mask built from a profile
+    read at generation g is only stored if the generation is still g, so a preference
+    change that commits while the mask is being built cannot be overwritten by it.
+    """
+
+    def __init__(self, max_bytes: int = int(EXCLUSION_CACHE_MB * 1024 * 1024)):
+        self.max_bytes = max_bytes
+        self._masks = OrderedDict()
+        self._bytes = 0
+        self._generations = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, user_id, media_type):
+        with self._lock:
+            mask = self._masks.get((user_id, media_type))
+            if mask is None:
+                self.misses += 1
+                return None
+            self._masks.move_to_end((user_id, media_type))
+            self.hits += 1
+            return mask
+
+    def generation(self, user_id) -> int:
+        """Read before loading the profile a mask is built from; pass the value to put()."""
+        with self._lock:
+            return self._generations.get(user_id, 0)
+
+    def _bump(self, user_id):
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def put(self, user_id, media_type, mask: np.ndarray, generation: int):
+        """Stores a mask unless the user's preferences changed since `generation` was read."""
+        key = (user_id, media_type)
+        with self._lock:
+            if self._generations.get(user_id, 0) != generation:
+                return
+            old = self._masks.pop(key, None)
+            if old is not None:
+                self._bytes -= old.nbytes
+            self._masks[key] = mask
+            self._bytes += mask.nbytes
+            while self._bytes > self.max_bytes and len(self._masks) > 1:
+                _, evicted = self._masks.popitem(last=False)
+                self._bytes -= evicted.nbytes
+
+    def patch(self, user_id, media_type, rows=None, extra_mask=None):
+        """Marks more rows as excluded in a cached mask. No-op if the mask is not cached."""
+        key = (user_id, media_type)
+        with self._lock:
+            self._bump(user_id)
+            mask = self._masks.get(key)
+            if mask is None:
+                return
+            patched = mask.copy()
+            if rows is not None and len(rows):
+                patched[rows] = True
+            if extra_mask is not None:
+                patched |= extra_mask
+            self._masks[key] = patched
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._bump(user_id)
+            for key in [k for k in self._masks if k[0] == user_id]:
+                self._bytes -= self._masks.pop(key).nbytes
+
+    def stats(self):
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "entries": len(self._masks),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+        }
@@ -0,0 +1,254 @@
+"""Vector index backends and the shared ranking stage.
+
+NumPy-native vector index (alternative to Chroma).
+
+Layout of an index directory:
+    embeddings.npy - float32 matrix, one unit-normalized row per catalog item (opened with mmap)
+    items.json     - {"ids": [...], "metadatas": [...]} aligned with the matrix rows
+
+Search is exact: a blocked matrix product against the query vector followed by
+argpartition top-k. Select it with VECTOR_BACKEND=numpy.
+
+Both backends expose `candidates(query_vec, fetch_k, exclude)` and share `search()`,
+which re-ranks candidates with the vectorized MMR in `mmr_select`. Per-user exclusions
+are applied inside candidate retrieval, so excluded rows never take up result slots.
+"""
+import json
+import os
+import shutil
+from abc import ABC, abstractmethod
+
+import numpy as np
+
+from src.backend.catalog import index_documents
+from src.backend.embeddings import embedding_model_id
+
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "chroma").lower()
+
+# Rows scored per matrix product; bounds temporary memory on large catalogs
+SEARCH_BLOCK_ROWS = 65536
+
+
+def unit_rows(vectors):
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim == 1:
+        return vectors / max(np.linalg.norm(vectors), 1e-12)
+    return vectors / np.clip(np.linalg.norm(vectors, axis=1, keepdims=True), 1e-12, None)
+
+
+def mmr_select(query_vec, candidates, k, lambda_mult=0.5):
+    """Maximal marginal relevance over a candidate matrix.
+
+    Loops over the k picks only; each step is one vectorized score update, with the
+    max-similarity-to-selected vector updated incrementally from the newest pick.
+    Returns (selected candidate indices, their query similarities).
+    """
+    cand = unit_rows(candidates)
+    n = cand.shape[0]
+    k = min(k, n)
+    if k <= 0:
+        return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+    relevance = cand @ unit_rows(query_vec)
+
+    selected = np.empty(k, dtype=np.int64)
+    max_sim = np.full(n, -np.inf, dtype=np.float32)
+    taken = np.zeros(n, dtype=bool)
+    idx = int(np.argmax(relevance))
+    for j in range(k):
+        if j:
+            scores = lambda_mult * relevance - (1.0 - lambda_mult) * max_sim
+            scores[taken] = -np.inf
+            idx = int(np.argmax(scores))
+        selected[j] = idx
+        taken[idx] = True
+        np.maximum(max_sim, cand @ cand[idx], out=max_sim)
+    return selected, relevance[selected]
+
+
+class VectorIndex(ABC):
+    """Shared ranking on top of a backend's candidates(query_vec, fetch_k, exclude)."""
+
+    row_of = None
+
+    def attach_catalog(self, item_ids):
+        """Maps item ids to catalog DataFrame positions so hits resolve with iloc."""
+        self.row_of = {item_id: pos for pos, item_id in enumerate(item_ids)}
+
+    @abstractmethod
+    def candidates(self, query_vec, fetch_k, exclude=None):
+        """Returns (catalog positions, embedding matrix, query similarities), best first.
+
+        `exclude` is an optional boolean mask over catalog positions; excluded rows are
+        never returned and do not count towards fetch_k.
+        """
+
+    def search(self, query_vec, k=100, fetch_k=1000, lambda_mult=0.5, diversify=True, exclude=None):
+        """Returns (catalog positions, similarities) in rank order, MMR-diversified unless diversify=False."""
+        positions, vectors, scores = self.candidates(query_vec, max(fetch_k, k), exclude)
+        if not len(positions):
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        if diversify:
+            picks, sims = mmr_select(query_vec, vectors, k, lambda_mult)
+        else:
+            picks = np.arange(min(k, len(positions)))
+            sims = scores[picks]
+        return positions[picks], np.asarray(sims, dtype=np.float32)
+
+
+class ChromaVectorIndex(VectorIndex):
+    """Adapter exposing a langchain Chroma store through the VectorIndex interface.
+
+    Chroma cannot filter on a per-request row set, so exclusions are applied by
+    over-fetching: the result window doubles until fetch_k valid candidates (or the
+    whole collection) have been seen.
+    """
+
+    def __init__(self, db, embedding_fn):
+        self.db = db
+        self.embedding_fn = embedding_fn
+
+    def __len__(self):
+        return self.db._collection.count()
+
+    def candidates(self, query_vec, fetch_k, exclude=None):
+        total = len(self)
+        n_results = min(fetch_k, total)
+        q = unit_rows(query_vec)
+        while n_results > 0:
+            result = self.db._collection.query(
+                query_embeddings=[q.tolist()],
+                n_results=n_results,
+                include=["metadatas", "embeddings"],
+            )
+            positions = np.array(
+                [self.row_of.get((meta or {}).get("item_id"), -1) for meta in result["metadatas"][0]],
+                dtype=np.int64
+            )
+            valid = positions >= 0
+            if exclude is not None:
+                valid[valid] = ~exclude[positions[valid]]
+            if valid.sum() >= fetch_k or n_results >= total:
+                vectors = unit_rows(result["embeddings"][0])[valid][:fetch_k]
+                return positions[valid][:fetch_k], vectors, vectors @ q
+            n_results = min(n_results * 2, total)
+        return np.array([], dtype=np.int64), np.zeros((0, 0), dtype=np.float32), np.array([], dtype=np.float32)
+
+
+class NumpyVectorIndex(VectorIndex):
+    def __init__(self, path, embedding_fn, vectors, ids, metadatas):
+        self.path = path
+        self.embedding_fn = embedding_fn
+        self.vectors = vectors
+        self.ids = ids
+        self.metadatas = metadatas
+
+    @classmethod
+    def open(cls, path, embedding_fn):
+        vectors = np.load(os.path.join(path, "embeddings.npy"), mmap_mode="r")
+        with open(os.path.join(path, "items.json"), encoding="utf-8") as f:
+            items = json.load(f)
+        if len(items["ids"]) != vectors.shape[0]:
+            raise ValueError(f"{path}: {len(items['ids'])} items but {vectors.shape[0]} vectors")
+        return cls(path, embedding_fn, vectors, items["ids"], items["metadatas"])
+
+    @staticmethod
+    def save(path, ids, metadatas, vectors):
+        """Writes a complete index to a temp directory and swaps it into place."""
+        tmp_dir, old_dir = path + ".tmp", path + ".old"
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        os.makedirs(tmp_dir)
+        np.save(os.path.join(tmp_dir, "embeddings.npy"), unit_rows(vectors))
+        with open(os.path.join(tmp_dir, "items.json"), "w", encoding="utf-8") as f:
+            json.dump({"ids": ids, "metadatas": metadatas}, f)
+        shutil.rmtree(old_dir, ignore_errors=True)
+        if os.path.exists(path):
+            os.replace(path, old_dir)
+        os.replace(tmp_dir, path)
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+    @classmethod
+    def open_or_build(cls, path, embedding_fn, df, spec):
+        """Opens the index and re-embeds only rows that were added or changed since it was written."""
+        name = spec["name"]
+        model_id = embedding_model_id(embedding_fn)
+        texts, ids, metadatas = index_documents(df, spec, model_id=model_id)
+        hashes = [m["content_hash"] for m in metadatas]
+
+        index = None
+        if os.path.exists(path):
+            try:
+                index = cls.open(path, embedding_fn)
+                print(f"Loaded existing {name} vector index ({len(index)} items).")
+                stored_models = {m.get("embedding_model") for m in index.metadatas}
+                if index.ids and stored_models != {model_id}:
+                    print(f"WARNING: {name} vector index was embedded with {sorted(map(str, stored_models))}, "
+                          f"queries now use {model_id}. Re-embedding the catalog.")
+                if index.ids == ids and [m.get("content_hash") for m in index.metadatas] == hashes:
+                    print(f"{name} vector index is up to date.")
+                    return index
+            except Exception as e:
+                print(f"Error loading {name} vector index: {e}. Rebuilding...")
+                index = None
+
+        # Reuse stored vectors for unchanged (item id, content hash) pairs
+        stored_rows = {}
+        if index is not None:
+            stored_rows = {
+                (doc_id, meta.get("content_hash")): row
+                for row, (doc_id, meta) in enumerate(zip(index.ids, index.metadatas))
+            }
+        keys = list(zip(ids, hashes))
+        reuse = [(i, stored_rows[k]) for i, k in enumerate(keys) if k in stored_rows]
+        changed = [i for i, k in enumerate(keys) if k not in stored_rows]
+        print(f"Syncing {name} vector index: {len(changed)} added/changed, {len(reuse)} reused.")
+
+        embedded = None
+        if changed:
+            embedded = np.asarray(embedding_fn.embed_documents([texts[i] for i in changed]), dtype=np.float32)
+        if embedded is not None:
+            dim = embedded.shape[1]
+        else:
+            dim = index.vectors.shape[1] if index is not None else 384
+        vectors = np.zeros((len(keys), dim), dtype=np.float32)
+        if reuse:
+            new_rows, old_rows = (list(r) for r in zip(*reuse))
+            vectors[new_rows] = index.vectors[old_rows]
+        if changed:
+            vectors[changed] = embedded
+        cls.save(path, ids, metadatas, vectors)
+        return cls.open(path, embedding_fn)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def attach_catalog(self, item_ids):
+        super().attach_catalog(item_ids)
+        # Index row -> catalog position (-1 for rows not in the loaded catalog)
+        self.catalog_pos = np.array([self.row_of.get(i, -1) for i in self.ids], dtype=np.int64)
+
+    def search_by_vector(self, query_vec, fetch_k, invalid=None):
+        """Exact top-k by cosine similarity over index rows, skipping rows flagged in `invalid`.
+        Returns (rows, scores), best first."""
+        q = unit_rows(query_vec)
+        n = self.vectors.shape[0]
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, SEARCH_BLOCK_ROWS):
+            scores[start:start + SEARCH_BLOCK_ROWS] = self.vectors[start:start + SEARCH_BLOCK_ROWS] @ q
+        if invalid is not None:
+            scores[invalid] = -np.inf
+            n -= int(invalid.sum())
+        fetch_k = min(fetch_k, n)
+        if fetch_k <= 0:
+            return np.array([], dtype=np.int64), np.array([], dtype=np.float32)
+        top = np.argpartition(-scores, fetch_k - 1)[:fetch_k]
+        top = top[np.argsort(-scores[top])]
+        return top, scores[top]
+
+    def candidates(self, query_vec, fetch_k, exclude=None):
+        # Filtered top-k: excluded rows are masked out before argpartition
+        invalid = self.catalog_pos < 0
+        if exclude is not None:
+            invalid |= exclude[np.maximum(self.catalog_pos, 0)]
+        rows, scores = self.search_by_vector(query_vec, fetch_k, invalid if invalid.any() else None)
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        return self.catalog_pos[rows], vectors, scores
@@ -0,0 +1,146 @@
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional
+
+import wikipedia
+from wikipedia.exceptions import DisambiguationError, PageError
+
+from src.backend.caching import LRUCache
+
+from src.backend.executors import run_io
+from src.database.db_manager import DatabaseManager
+
+NO_DETAILS = "No details available."
+
+# Tunables (override via env)
+WIKI_WORKERS = int(os.getenv("WIKI_WORKERS", "8"))
+WIKI_CACHE_TTL = float(os.getenv("WIKI_CACHE_TTL", str(30 * 24 * 3600)))  # 30 days
+WIKI_NEGATIVE_TTL = float(os.getenv("WIKI_NEGATIVE_TTL", str(24 * 3600)))  # 1 day
+WIKI_TIMEOUT = float(os.getenv("WIKI_TIMEOUT", "10"))
+WIKI_MEMORY_SIZE = int(os.getenv("WIKI_MEMORY_SIZE", "50000"))  # titles held in process
+
+_MISSING = object()
+
+
+def fetch_wiki_summary(title) -> Optional[str]:
+    """Looks up the first sentence of the best matching Wikipedia page. Returns None if nothing was found.
+
+    Network errors and timeouts are raised, so they are not mistaken for a known miss.
+    """
+    results = wikipedia.search(title)
+    if not results:
+        return None
+    try:
+        page = wikipedia.page(results[0], auto_suggest=False)
+    except (DisambiguationError, PageError):
+        return None
+    return page.summary.split(".")[0] + "."
+
+
+class WikiDescriptionFetcher:
+    """Fetches Wikipedia summaries concurrently, backed by a persistent title -> summary cache.
+
+    Cache layers:
+      1. In-process LRU (hot titles never touch SQLite twice), same TTLs as the table
+      2. `wiki_cache` table in the DatabaseManager SQLite file (TTL + negative caching)
+    Concurrent requests for the same title share one in-flight lookup.
+    """
+
+    def __init__(self, db: DatabaseManager, max_workers: int = WIKI_WORKERS,
+                 ttl: float = WIKI_CACHE_TTL, negative_ttl: float = WIKI_NEGATIVE_TTL):
+        self.db = db
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="wiki")
+        self._memory = LRUCache(maxsize=WIKI_MEMORY_SIZE, ttl=ttl)
+        self._inflight = {}
+        self._lock = threading.Lock()
+
+    def get(self, title) -> Optional[str]:
+        return self.get_many([title]).get(str(title))
+
+    def get_many(self, titles: List[str], timeout: float = WIKI_TIMEOUT) -> Dict[str, Optional[str]]:
+        """Returns {title: summary or None}. Titles that time out are left out of the result."""
+        futures = self.futures(titles)
+        wait(futures.values(), timeout=timeout)
+        return {t: fut.result() for t, fut in futures.items() if fut.done()}
+
+    async def aget_many(self, titles: List[str], timeout: float = WIKI_TIMEOUT) -> Dict[str, Optional[str]]:
+        """Async get_many: awaits the lookups without blocking the event loop."""
+        # Cache lookups hit SQLite, so resolve them on the I/O pool; fetches run on the wiki pool
+        futures = await run_io(self.futures, titles)
+        pending = {t: asyncio.wrap_future(f) for t, f in futures.items()}
+        if pending:
+            await asyncio.wait(pending.values(), timeout=timeout)
+        return {t: f.result() for t, f in pending.items() if f.done()}
+
+    def futures(self, titles: List[str]) -> Dict[str, Future]:
+        """Returns {title: Future[summary or None]}. Cached titles come back already resolved."""
+        titles = list(dict.fromkeys(str(t) for t in titles))
+        found = self.cached(titles)
+
+        futures = {}
+        for t in titles:
+            if t in found:
+                fut = Future()
+                fut.set_result(found[t])
+                futures[t] = fut
+            else:
+                futures[t] = self._submit(t)
+        return futures
+
+    def cached(self, titles: List[str]) -> Dict[str, Optional[str]]:
+        """Cache-only lookup: {title: summary or None} for titles already resolved. Never hits the network."""
+        titles = list(dict.fromkeys(str(t) for t in titles))
+        found = {}
+        for t in titles:
+            value = self._memory.get(t, _MISSING)
+            if value is not _MISSING:
+                found[t] = value
+
+        missing = [t for t in titles if t not in found]
+        if missing:
+            try:
+                cached = self.db.get_wiki_summaries(missing, self.ttl, self.negative_ttl)
+            except Exception as e:
+                print(f"Wiki cache read failed: {e}")
+                cached = {}
+            for t, summary in cached.items():
+                self._remember(t, summary)
+            found.update(cached)
+        return found
+
+    def purge_expired(self) -> int:
+        """Deletes `wiki_cache` rows past their TTL; reads skip them, but nothing else removes them."""
+        return self.db.purge_wiki_summaries(self.ttl, self.negative_ttl)
+
+    def _remember(self, title, summary):
+        self._memory.set(title, summary, ttl=self.ttl if summary is not None else self.negative_ttl)
+
+    def _submit(self, title):
+        with self._lock:
+            fut = self._inflight.get(title)
+            if fut is None:
+                fut = self._pool.submit(self._fetch_and_store, title)
+                self._inflight[title] = fut
+            return fut
+
+    def _fetch_and_store(self, title) -> Optional[str]:
+        try:
+            try:
+                summary = fetch_wiki_summary(title)
+            except Exception as e:
+                # Transient failure: report no summary this time, but cache nothing
+                print(f"Wikipedia lookup failed for {title!r}: {e}")
+                return None
+            self._remember(title, summary)
+            try:
+                self.db.save_wiki_summaries({title: summary})
+            except Exception as e:
+                print(f"Wiki cache write failed: {e}")
+            return summary
+        finally:
+            with self._lock:
+                self._inflight.pop(title, None)
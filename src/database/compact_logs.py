@@ -0,0 +1,82 @@
+"""One-shot migration of legacy interaction logs to the compact item-id encoding.
+
+Legacy rows store the full RecommendationItem JSON. Each row whose items can all be
+matched to the current catalog by title is rewritten as ranked item ids (see log_codec.py)
+and its JSON is dropped. Rows with items that are no longer in the catalog are left
+untouched, so no history is lost. Safe to re-run; already compacted rows are skipped.
+
+Usage (from project root):
+    python -m src.database.compact_logs [--batch-size 500] [--dry-run] [--vacuum]
+"""
+import argparse
+import json
+import os
+import sys
+
+import pandas as pd
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.backend.catalog import CATALOGS, item_ids
+from src.database.db_manager import DatabaseManager
+from src.models.schemas import MediaType
+
+
+def load_title_ids():
+    """{media_type value: {title: item id of its first catalog occurrence}}"""
+    title_ids = {}
+    for media_type, spec in CATALOGS.items():
+        df = pd.read_csv(spec["csv"], usecols=[spec["title_col"]])
+        ids = {}
+        for title, item_id in zip(df[spec["title_col"]].astype(str), item_ids(df, spec)):
+            ids.setdefault(title, item_id)
+        title_ids[media_type.value] = ids
+    return title_ids
+
+
+def compact(db, title_ids, batch_size, dry_run=False):
+    compacted, kept, after_id = 0, 0, 0
+    while True:
+        rows = db.get_legacy_logs(after_id, batch_size)
+        if not rows:
+            break
+        updates = []
+        for log_id, media_type, recs_json in rows:
+            try:
+                items = json.loads(recs_json)
+                lookup = title_ids[MediaType(media_type).value]
+                ids = [lookup[str(item["title"])] for item in items]
+            except (ValueError, KeyError, TypeError):
+                kept += 1  # Unparseable, or some item left the catalog: keep the JSON
+                continue
+            # Legacy logs never recorded scores
+            updates.append((log_id, ids, None))
+        if updates and not dry_run:
+            db.save_compacted_logs(updates)
+        compacted += len(updates)
+        after_id = rows[-1][0]
+        print(f"Processed logs up to id {after_id}: {compacted} compacted, {kept} kept as JSON.")
+    return compacted, kept
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compact legacy interaction logs to item ids.")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--dry-run", action="store_true", help="Report what would change without writing")
+    parser.add_argument("--vacuum", action="store_true", help="VACUUM afterwards to return freed pages to the OS")
+    args = parser.parse_args()
+
+    db = DatabaseManager()
+    compacted, kept = compact(db, load_title_ids(), args.batch_size, args.dry_run)
+    print(f"Done: {compacted} logs compacted, {kept} left as JSON{' (dry run)' if args.dry_run else ''}.")
+
+    if args.vacuum and compacted and not args.dry_run:
+        conn = db._get_conn()
+        conn.execute("VACUUM")
+        conn.close()
+        print("Database vacuumed.")
+
+
+if __name__ == "__main__":
+    main()
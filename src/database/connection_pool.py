@@ -0,0 +1,97 @@
+import os
+import queue
+import sqlite3
+import threading
+
+# Tunables (override via env)
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "16"))  # idle connections kept per database file
+DB_CACHE_SIZE_KB = int(os.getenv("DB_CACHE_SIZE_KB", "16384"))  # page cache per connection
+DB_MMAP_SIZE = int(os.getenv("DB_MMAP_SIZE", str(256 * 1024 * 1024)))
+DB_BUSY_TIMEOUT_MS = int(os.getenv("DB_BUSY_TIMEOUT_MS", "5000"))
+DB_STATEMENT_CACHE = 256
+
+
+class PooledConnection:
+    """sqlite3.Connection proxy whose close() hands the connection back to its pool."""
+
+    def __init__(self, pool, conn):
+        self._pool = pool
+        self._conn = conn
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+    def close(self):
+        if self._conn is not None:
+            self._pool.release(self._conn)
+            self._conn = None
+
+
+class ConnectionPool:
+    """Thread-safe pool of WAL-mode SQLite connections for one database file.
+
+    Connections are opened with check_same_thread=False and a prepared statement cache,
+    and handed out LIFO so hot connections keep a warm page cache. The pool never blocks:
+    if no idle connection is available a new one is opened, and connections beyond
+    DB_POOL_SIZE are closed when released.
+    """
+
+    _pools = {}
+    _pools_lock = threading.Lock()
+
+    @classmethod
+    def for_path(cls, db_path):
+        """One shared pool per database file, across DatabaseManager instances."""
+        with cls._pools_lock:
+            pool = cls._pools.get(db_path)
+            if pool is None:
+                pool = cls(db_path)
+                cls._pools[db_path] = pool
+            return pool
+
+    def __init__(self, db_path, max_idle=DB_POOL_SIZE):
+        self.db_path = db_path
+        self._idle = queue.LifoQueue(maxsize=max_idle)
+        self._wal_enabled = False
+        self._lock = threading.Lock()
+
+    def _open(self):
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            timeout=DB_BUSY_TIMEOUT_MS / 1000,
+            cached_statements=DB_STATEMENT_CACHE,
+        )
+        with self._lock:
+            if not self._wal_enabled:
+                # Persistent per database file: readers no longer block on writers
+                conn.execute("PRAGMA journal_mode=WAL")
+                self._wal_enabled = True
+        conn.execute("PRAGMA synchronous=NORMAL")  # Safe with WAL; fsync only at checkpoints
+        conn.execute(f"PRAGMA cache_size=-{DB_CACHE_SIZE_KB}")
+        conn.execute(f"PRAGMA mmap_size={DB_MMAP_SIZE}")
+        conn.execute("PRAGMA temp_store=MEMORY")
+        conn.execute(f"PRAGMA busy_timeout={DB_BUSY_TIMEOUT_MS}")
+        return conn
+
+    def acquire(self):
+        try:
+            conn = self._idle.get_nowait()
+        except queue.Empty:
+            conn = self._open()
+        return PooledConnection(self, conn)
+
+    def release(self, conn):
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+            self._idle.put_nowait(conn)
+        except (queue.Full, sqlite3.Error):
+            conn.close()
+
+    def close_all(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
@@ -1,56 +1,29 @@
-import sqlite3
+"""Creates or upgrades the application database.
+
+The schema lives in migrations.py; this script just applies any pending migrations
+(DatabaseManager does the same on startup).
+
+Usage (from project root):
+    python -m src.database.db_init
+"""
 import os
-from datetime import datetime
+import sys
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database", "project.db")
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.database.db_manager import DB_PATH
+from src.database.connection_pool import ConnectionPool
+from src.database.migrations import migrate
 
 def init_db():
     print(f"Initializing database at: {DB_PATH}")
     os.makedirs(os.path.dirname(DB_PATH), exist_ok=True)
     
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
-    
-    # 1. Users Table
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS users (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        username TEXT UNIQUE NOT NULL,
-        password_hash TEXT NOT NULL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    ''')
-    
-    # 2. Interaction Logs (Requirement C)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS interaction_logs (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        query_text TEXT,
-        media_type TEXT,
-        tone TEXT,
-        agent_response TEXT,
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
-    ''')
-    
-    # 3. User Profile / Memory (Requirement B - Memory)
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS user_profile (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        user_id INTEGER,
-        preference_type TEXT,  -- 'FAVORITE', 'DISLIKE', 'WISHLIST'
-        item_value TEXT,       -- e.g., 'Horror' or 'The Matrix'
-        category TEXT,         -- 'GENRE' or 'TITLE'
-        timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-        FOREIGN KEY (user_id) REFERENCES users (id)
-    )
-    ''')
-    
-    conn.commit()
+    conn = ConnectionPool.for_path(DB_PATH).acquire()
+    version = migrate(conn)
     conn.close()
-    print("Database initialized successfully.")
+    print(f"Database initialized successfully (schema version {version}).")
 
 if __name__ == "__main__":
     init_db()
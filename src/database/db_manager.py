@@ -3,8 +3,13 @@ import os
 import json
 from typing import List, Optional, Dict, Any
 import hashlib
+import time
 from datetime import datetime
 
+from src.database.connection_pool import ConnectionPool
+from src.database.log_codec import decode_items, encode_items
+from src.database.migrations import migrate
+
 # Use absolute path relative to this file
 DB_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "database", "project.db")
 
@@ -13,76 +18,29 @@ class DatabaseManager:
         self.db_path = db_path
         # Ensure database directory exists
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        self._pool = ConnectionPool.for_path(self.db_path)
         self._ensure_schema()
 
+    _migrated = set()  # Database files already migrated by this process
+
     def _ensure_schema(self):
-        """Ensures the schema is up to date."""
+        """Brings the schema up to date (see migrations.py), once per database file and process."""
+        if self.db_path in DatabaseManager._migrated:
+            return
         conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        # 1. Create Users Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                username TEXT UNIQUE NOT NULL,
-                password_hash TEXT NOT NULL,
-                email TEXT,
-                full_name TEXT,
-                profile_image TEXT,
-                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        # 2. Create Interaction Logs Table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS interaction_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                query_text TEXT,
-                tone TEXT,
-                media_type TEXT,
-                agent_response TEXT,
-                recommendations TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # 3. Create User Profile Table (Preferences)
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS user_profile (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_id INTEGER,
-                preference_type TEXT,
-                item_value TEXT,
-                category TEXT,
-                timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(user_id) REFERENCES users(id)
-            )
-        ''')
-        
-        # Check if users table has email and full_name
-        cursor.execute("PRAGMA table_info(users)")
-        columns = [info[1] for info in cursor.fetchall()]
-        
-        if 'email' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN email TEXT")
-        if 'full_name' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN full_name TEXT")
-        if 'profile_image' not in columns:
-            cursor.execute("ALTER TABLE users ADD COLUMN profile_image TEXT")
-            
-        # Check interaction_logs for recommendations
-        cursor.execute("PRAGMA table_info(interaction_logs)")
-        log_columns = [info[1] for info in cursor.fetchall()]
-        if 'recommendations' not in log_columns:
-            cursor.execute("ALTER TABLE interaction_logs ADD COLUMN recommendations TEXT")
-
-        conn.commit()
-        conn.close()
+        try:
+            migrate(conn)
+        finally:
+            conn.close()
+        DatabaseManager._migrated.add(self.db_path)
 
     def _get_conn(self):
-        return sqlite3.connect(self.db_path)
+        """Borrows a pooled WAL connection; conn.close() returns it to the pool."""
+        return self._pool.acquire()
+
+    def close(self):
+        """Closes the idle pooled connections of this database file (call on shutdown)."""
+        self._pool.close_all()
 
     def register_user(self, username, password, email=None, full_name=None):
         """Registers a new user. Returns user_id if successful, None if username exists."""
@@ -122,46 +80,73 @@ class DatabaseManager:
         conn.close()
         return not exists
 
-    def log_interaction(self, user_id: int, query_text: str, tone: str, media_type: str, agent_response: str, recommendations: List[Dict] = None):
+    @staticmethod
+    def _log_row(user_id, query_text, tone, media_type, agent_response, recommendations=None, item_ids=None, scores=None):
+        """New logs store ranked item ids + scores; full item JSON only when no ids are given."""
+        if item_ids is not None:
+            return (user_id, query_text, tone, media_type, agent_response, None, encode_items(item_ids, scores))
+        recs_json = json.dumps(recommendations) if recommendations else None
+        return (user_id, query_text, tone, media_type, agent_response, recs_json, None)
+
+    def log_interaction(self, user_id: int, query_text: str, tone: str, media_type: str, agent_response: str,
+                        recommendations: List[Dict] = None, item_ids: List[str] = None, scores: List[float] = None):
         """Logs the specific interaction for auditing (Requirement C)."""
+        self.log_interactions([dict(
+            user_id=user_id, query_text=query_text, tone=tone, media_type=media_type,
+            agent_response=agent_response, recommendations=recommendations, item_ids=item_ids, scores=scores
+        )])
+
+    def log_interactions(self, records: List[Dict]):
+        """Inserts a batch of log_interaction() keyword dicts in one transaction (group commit)."""
+        rows = [self._log_row(**r) for r in records]
         conn = self._get_conn()
-        cursor = conn.cursor()
-        
-        recs_json = json.dumps(recommendations) if recommendations else None
-        
-        cursor.execute(
-            "INSERT INTO interaction_logs (user_id, query_text, tone, media_type, agent_response, recommendations) VALUES (?, ?, ?, ?, ?, ?)",
-            (user_id, query_text, tone, media_type, agent_response, recs_json)
+        conn.executemany(
+            "INSERT INTO interaction_logs (user_id, query_text, tone, media_type, agent_response, recommendations, rec_items) VALUES (?, ?, ?, ?, ?, ?, ?)",
+            rows
         )
         conn.commit()
         conn.close()
 
+    _ADD_PREFERENCE_SQL = (
+        "INSERT INTO user_profile (user_id, preference_type, item_value, category) VALUES (?, ?, ?, ?) "
+        "ON CONFLICT (user_id, preference_type, item_value) DO NOTHING"
+    )
+    _REMOVE_PREFERENCE_SQL = "DELETE FROM user_profile WHERE user_id = ? AND preference_type = ? AND item_value = ?"
+
     def add_preference(self, user_id: int, preference_type: str, item_value: str, category: str):
         """Adds a preference (FAVORITE/DISLIKE) to user profile (Requirement B - Memory)."""
         conn = self._get_conn()
-        cursor = conn.cursor()
-        # Avoid duplicates
-        cursor.execute(
-            "SELECT id FROM user_profile WHERE user_id = ? AND preference_type = ? AND item_value = ?",
-            (user_id, preference_type, item_value)
-        )
-        if not cursor.fetchone():
-            cursor.execute(
-                "INSERT INTO user_profile (user_id, preference_type, item_value, category) VALUES (?, ?, ?, ?)",
-                (user_id, preference_type, item_value, category)
-            )
-            conn.commit()
+        # Duplicates are skipped by the unique index on (user_id, preference_type, item_value)
+        conn.execute(self._ADD_PREFERENCE_SQL, (user_id, preference_type, item_value, category))
+        conn.commit()
         conn.close()
 
+    def apply_preference_changes(self, user_id: int, operations: List[Dict]):
+        """Applies a list of {"action": "add"|"remove", "preference_type", "item_value", "category"}
+        in order, in one transaction, and returns the resulting profile (see get_user_profile)."""
+        conn = self._get_conn()
+        try:
+            for op in operations:
+                if op["action"] == "add":
+                    conn.execute(
+                        self._ADD_PREFERENCE_SQL,
+                        (user_id, op["preference_type"], op["item_value"], op.get("category"))
+                    )
+                elif op["action"] == "remove":
+                    conn.execute(self._REMOVE_PREFERENCE_SQL, (user_id, op["preference_type"], op["item_value"]))
+                else:
+                    raise ValueError(f"Unknown preference action: {op['action']}")
+            conn.commit()
+            return self._build_profile(self._profile_rows(conn, user_id))
+        finally:
+            # Rolls back anything left uncommitted by a failed operation
+            conn.close()
+
     def remove_preference(self, user_id: int, preference_type: str, item_value: str):
         """Removes a preference from user profile."""
         conn = self._get_conn()
         cursor = conn.cursor()
-        cursor.execute(
-            "DELETE FROM user_profile WHERE user_id = ? AND preference_type = ? AND item_value = ?",
-            (user_id, preference_type, item_value)
-        )
-        conn.commit()
+        cursor.execute(self._REMOVE_PREFERENCE_SQL, (user_id, preference_type, item_value))
         conn.commit()
         conn.close()
 
@@ -201,11 +186,18 @@ class DatabaseManager:
     def get_user_profile(self, user_id: int):
         """Retrieves raw profile data (favorites/dislikes)."""
         conn = self._get_conn()
+        rows = self._profile_rows(conn, user_id)
+        conn.close()
+        return self._build_profile(rows)
+
+    @staticmethod
+    def _profile_rows(conn, user_id: int):
         cursor = conn.cursor()
         cursor.execute("SELECT preference_type, item_value, category FROM user_profile WHERE user_id = ?", (user_id,))
-        rows = cursor.fetchall()
-        conn.close()
-        
+        return cursor.fetchall()
+
+    @staticmethod
+    def _build_profile(rows):
         profile = {
             "favorite_genres": [],
             "favorite_items": [],
@@ -238,17 +230,35 @@ class DatabaseManager:
 
     def get_chat_history(self, user_id: int):
         """Retrieves last 20 chat interactions for Sidebar."""
+        history, _ = self.get_chat_history_page(user_id, 20)
+        return history
+
+    def get_chat_history_page(self, user_id: int, page_size: int, before: Optional[tuple] = None):
+        """Keyset-paginated chat history, newest first.
+
+        `before` is the (timestamp, id) key of the last row of the previous page. Returns
+        (history, next_key) where next_key is None on the last page. Every page is one
+        seek on idx_interaction_logs_user_time, however deep the user pages.
+        """
         conn = self._get_conn()
         cursor = conn.cursor()
-        cursor.execute(
-            "SELECT id, query_text, tone, media_type, timestamp FROM interaction_logs WHERE user_id = ? ORDER BY timestamp DESC LIMIT 20",
-            (user_id,)
-        )
+        if before is None:
+            cursor.execute(
+                "SELECT id, query_text, tone, media_type, timestamp FROM interaction_logs WHERE user_id = ? "
+                "ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (user_id, page_size + 1)
+            )
+        else:
+            cursor.execute(
+                "SELECT id, query_text, tone, media_type, timestamp FROM interaction_logs WHERE user_id = ? "
+                "AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+                (user_id, before[0], before[1], page_size + 1)
+            )
         rows = cursor.fetchall()
         conn.close()
         
         history = []
-        for r in rows:
+        for r in rows[:page_size]:
             history.append({
                 "id": r[0],
                 "query": r[1],
@@ -256,14 +266,43 @@ class DatabaseManager:
                 "mode": r[3],
                 "time": r[4]
             })
-        return history
+        next_key = (rows[page_size - 1][4], rows[page_size - 1][0]) if len(rows) > page_size else None
+        return history, next_key
+
+    _INTERACTION_COLUMNS = "id, query_text, tone, media_type, agent_response, recommendations, rec_items, timestamp"
+
+    @staticmethod
+    def _interaction_from_row(row, resolve_items=None):
+        if row[6] is not None:
+            item_ids, scores = decode_items(row[6])
+            if resolve_items:
+                recommendations = resolve_items(row[3], row[2], item_ids, scores)
+            else:
+                recommendations = [{"item_id": i, "score": s} for i, s in zip(item_ids, scores)]
+        else:
+            recommendations = json.loads(row[5]) if row[5] else []
+            
+        return {
+            "id": row[0],
+            "query_text": row[1],
+            "tone": row[2],
+            "media_type": row[3],
+            "agent_message": row[4],
+            "recommendations": recommendations,
+            "timestamp": row[7]
+        }
+
+    def get_interaction_details(self, interaction_id: int, resolve_items=None):
+        """Retrieves full details for a specific interaction.
 
-    def get_interaction_details(self, interaction_id: int):
-        """Retrieves full details for a specific interaction."""
+        Compact logs hold item ids only; `resolve_items(media_type, tone, item_ids, scores)`
+        rebuilds the full items from the catalog. Without a resolver they are returned as
+        {"item_id", "score"} stubs. Legacy rows return their stored JSON.
+        """
         conn = self._get_conn()
         cursor = conn.cursor()
         cursor.execute(
-            "SELECT id, query_text, tone, media_type, agent_response, recommendations, timestamp FROM interaction_logs WHERE id = ?",
+            f"SELECT {self._INTERACTION_COLUMNS} FROM interaction_logs WHERE id = ?",
             (interaction_id,)
         )
         row = cursor.fetchone()
@@ -271,13 +310,134 @@ class DatabaseManager:
         
         if not row:
             return None
-            
-        return {
-            "id": row[0],
-            "query_text": row[1],
-            "tone": row[2],
-            "media_type": row[3],
-            "agent_message": row[4],
-            "recommendations": json.loads(row[5]) if row[5] else [],
-            "timestamp": row[6]
-        }
+        return self._interaction_from_row(row, resolve_items)
+
+    def iter_interactions(self, user_id: int, batch_size: int = 500, resolve_items=None):
+        """Yields every interaction of a user, oldest first, in get_interaction_details format.
+
+        Rows are read with fetchmany, so memory stays flat however long the history is.
+        """
+        conn = self._get_conn()
+        try:
+            cursor = conn.cursor()
+            cursor.execute(
+                f"SELECT {self._INTERACTION_COLUMNS} FROM interaction_logs WHERE user_id = ? ORDER BY timestamp, id",
+                (user_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield self._interaction_from_row(row, resolve_items)
+        finally:
+            conn.close()
+
+    def get_legacy_logs(self, after_id: int, limit: int):
+        """Batch of (id, media_type, recommendations JSON) for logs not yet in the compact format."""
+        conn = self._get_conn()
+        rows = conn.execute(
+            "SELECT id, media_type, recommendations FROM interaction_logs "
+            "WHERE id > ? AND rec_items IS NULL AND recommendations IS NOT NULL ORDER BY id LIMIT ?",
+            (after_id, limit)
+        ).fetchall()
+        conn.close()
+        return rows
+
+    def save_compacted_logs(self, updates: List[tuple]):
+        """Replaces the recommendations JSON of each (id, item_ids, scores) with the compact encoding."""
+        conn = self._get_conn()
+        conn.executemany(
+            "UPDATE interaction_logs SET rec_items = ?, recommendations = NULL WHERE id = ?",
+            [(encode_items(ids, scores), log_id) for log_id, ids, scores in updates]
+        )
+        conn.commit()
+        conn.close()
+
+    def explain_query_plan(self, sql: str, params=()) -> List[str]:
+        """EXPLAIN QUERY PLAN detail lines for a statement (see query_plans.py)."""
+        conn = self._get_conn()
+        rows = conn.execute(f"EXPLAIN QUERY PLAN {sql}", params).fetchall()
+        conn.close()
+        return [row[-1] for row in rows]
+
+    def get_wiki_summaries(self, titles: List[str], ttl: float, negative_ttl: float) -> Dict[str, Optional[str]]:
+        """Returns cached Wikipedia summaries that are still fresh.
+        A value of None means the title is a cached miss (nothing found on Wikipedia)."""
+        if not titles:
+            return {}
+        now = time.time()
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        cached = {}
+        # Stay well under SQLite's bound-parameter limit
+        for i in range(0, len(titles), 500):
+            chunk = titles[i:i + 500]
+            placeholders = ",".join("?" * len(chunk))
+            cursor.execute(
+                f"SELECT title, summary, fetched_at FROM wiki_cache WHERE title IN ({placeholders})",
+                chunk
+            )
+            for title, summary, fetched_at in cursor.fetchall():
+                max_age = ttl if summary is not None else negative_ttl
+                if now - fetched_at < max_age:
+                    cached[title] = summary
+        conn.close()
+        return cached
+
+    def save_wiki_summaries(self, summaries: Dict[str, Optional[str]]):
+        """Stores fetched Wikipedia summaries. Pass None to record a miss."""
+        if not summaries:
+            return
+        now = time.time()
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT OR REPLACE INTO wiki_cache (title, summary, fetched_at) VALUES (?, ?, ?)",
+            [(title, summary, now) for title, summary in summaries.items()]
+        )
+        conn.commit()
+        conn.close()
+
+    def purge_wiki_summaries(self, ttl: float, negative_ttl: float) -> int:
+        """Deletes expired summaries and misses (see get_wiki_summaries). Returns the number of rows removed."""
+        now = time.time()
+        conn = self._get_conn()
+        cursor = conn.execute(
+            "DELETE FROM wiki_cache WHERE fetched_at <= CASE WHEN summary IS NULL THEN ? ELSE ? END",
+            (now - negative_ttl, now - ttl)
+        )
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
+
+    def get_cached_query(self, cache_key: str, ttl: float) -> Optional[str]:
+        """Returns a cached enhanced query if it is younger than ttl seconds."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        cursor.execute(
+            "SELECT enhanced_query FROM query_cache WHERE cache_key = ? AND created_at > ?",
+            (cache_key, time.time() - ttl)
+        )
+        row = cursor.fetchone()
+        conn.close()
+        return row[0] if row else None
+
+    def save_cached_query(self, cache_key: str, enhanced_query: str):
+        """Stores an enhanced query in the persistent cache."""
+        conn = self._get_conn()
+        cursor = conn.cursor()
+        cursor.execute(
+            "INSERT OR REPLACE INTO query_cache (cache_key, enhanced_query, created_at) VALUES (?, ?, ?)",
+            (cache_key, enhanced_query, time.time())
+        )
+        conn.commit()
+        conn.close()
+
+    def purge_cached_queries(self, ttl: float) -> int:
+        """Deletes enhanced queries older than ttl seconds. Returns the number of rows removed."""
+        conn = self._get_conn()
+        cursor = conn.execute("DELETE FROM query_cache WHERE created_at <= ?", (time.time() - ttl,))
+        conn.commit()
+        conn.close()
+        return cursor.rowcount
@@ -0,0 +1,107 @@
+import os
+import queue
+import threading
+import time
+from typing import Dict
+
+from src.database.db_manager import DatabaseManager
+
+# Tunables (override via env)
+LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))
+LOG_BATCH_SIZE = int(os.getenv("LOG_BATCH_SIZE", "200"))
+LOG_SUBMIT_TIMEOUT = float(os.getenv("LOG_SUBMIT_TIMEOUT", "5"))
+
+_STOP = object()
+
+
+class InteractionLogWriter:
+    """Write-behind interaction logging.
+
+    Requests only enqueue a record; one background thread drains the queue and writes
+    everything that has piled up as a single transaction (group commit), so a burst of
+    N searches costs one fsync instead of N. The queue is bounded: when the writer falls
+    behind, submit() blocks for up to LOG_SUBMIT_TIMEOUT (backpressure) and then drops
+    the record rather than stalling the request indefinitely.
+    """
+
+    def __init__(self, db: DatabaseManager, max_queue: int = LOG_QUEUE_SIZE, batch_size: int = LOG_BATCH_SIZE):
+        self.db = db
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=max_queue)
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self._lock = threading.Lock()
+        self._thread = threading.Thread(target=self._run, name="interaction-log-writer", daemon=True)
+        self._thread.start()
+
+    def try_submit(self, record: Dict) -> bool:
+        """Enqueues without blocking. Returns False when the queue is full."""
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            return False
+
+    def submit(self, record: Dict, timeout: float = LOG_SUBMIT_TIMEOUT) -> bool:
+        """Enqueues, waiting up to `timeout` for room. Returns False if the record was dropped."""
+        try:
+            self._queue.put(record, timeout=timeout)
+            return True
+        except queue.Full:
+            self._count("dropped")
+            print(f"Interaction log queue full, dropped a record ({self.dropped} so far).")
+            return False
+
+    def depth(self) -> int:
+        return self._queue.qsize()
+
+    def stats(self):
+        return {
+            "queue_depth": self.depth(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "batches": self.batches,
+        }
+
+    def close(self):
+        """Writes out the remaining records and stops the writer thread."""
+        self._queue.put(_STOP)
+        self._thread.join()
+
+    def _run(self):
+        while True:
+            # 1. Block for the first record, then take whatever else is already waiting
+            batch = [self._queue.get()]
+            while len(batch) < self.batch_size and batch[-1] is not _STOP:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = batch[-1] is _STOP
+            records = [r for r in batch if r is not _STOP]
+
+            # 2. One transaction for the whole batch
+            if records:
+                self._write(records)
+
+            if stop:
+                return
+
+    def _write(self, records):
+        for attempt in range(3):
+            try:
+                self.db.log_interactions(records)
+                self._count("written", len(records))
+                self._count("batches")
+                return
+            except Exception as e:
+                print(f"Interaction log write failed (attempt {attempt + 1}): {e}")
+                time.sleep(0.5 * (attempt + 1))
+        self._count("dropped", len(records))
+
+    def _count(self, counter, n=1):
+        # Updated from request threads (dropped) and the writer thread
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + n)
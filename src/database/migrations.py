@@ -0,0 +1,165 @@
+"""Versioned schema migrations for the application database.
+
+Each migration is a (version, description, function) entry in MIGRATIONS, applied in
+order inside its own transaction. Applied versions are recorded in `schema_version`, so a
+database is only ever altered once per migration, whichever release created it (including
+databases created by older versions of db_init.py).
+
+To change the schema, append a new migration; never edit one that has shipped.
+"""
+import sqlite3
+
+
+def _columns(cursor, table):
+    cursor.execute(f"PRAGMA table_info({table})")
+    return {info[1] for info in cursor.fetchall()}
+
+
+def _base_tables(cursor):
+    # 1. Users Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT UNIQUE NOT NULL,
+            password_hash TEXT NOT NULL,
+            email TEXT,
+            full_name TEXT,
+            profile_image TEXT,
+            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    # 2. Interaction Logs Table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS interaction_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            query_text TEXT,
+            tone TEXT,
+            media_type TEXT,
+            agent_response TEXT,
+            recommendations TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # 3. User Profile Table (Preferences)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_profile (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            preference_type TEXT,
+            item_value TEXT,
+            category TEXT,
+            timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_id) REFERENCES users(id)
+        )
+    ''')
+
+    # 4. Columns missing from databases created by older releases
+    user_columns = _columns(cursor, "users")
+    for column in ("email", "full_name", "profile_image"):
+        if column not in user_columns:
+            cursor.execute(f"ALTER TABLE users ADD COLUMN {column} TEXT")
+    if "recommendations" not in _columns(cursor, "interaction_logs"):
+        cursor.execute("ALTER TABLE interaction_logs ADD COLUMN recommendations TEXT")
+
+
+def _cache_tables(cursor):
+    # Wikipedia Summary Cache (title -> summary, NULL summary = known miss)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS wiki_cache (
+            title TEXT PRIMARY KEY,
+            summary TEXT,
+            fetched_at REAL NOT NULL
+        )
+    ''')
+
+    # Enhanced Query Cache (LLM rewrites keyed on query/media/model/prompt version)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS query_cache (
+            cache_key TEXT PRIMARY KEY,
+            enhanced_query TEXT NOT NULL,
+            created_at REAL NOT NULL
+        )
+    ''')
+
+
+def _compact_log_items(cursor):
+    # Ranked item ids + scores (see log_codec.py); replaces the recommendations JSON
+    if "rec_items" not in _columns(cursor, "interaction_logs"):
+        cursor.execute("ALTER TABLE interaction_logs ADD COLUMN rec_items BLOB")
+
+
+def _hot_query_indexes(cursor):
+    # Chat history: rows for one user, newest first, served from the index alone.
+    # id is spelled out so (timestamp, id) ordering needs no extra sort.
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_interaction_logs_user_time
+        ON interaction_logs (user_id, timestamp, id, query_text, tone, media_type)
+    ''')
+    # Profile reads and the duplicate check in add_preference, served from the index alone
+    cursor.execute('''
+        CREATE INDEX IF NOT EXISTS idx_user_profile_user_pref
+        ON user_profile (user_id, preference_type, item_value, category)
+    ''')
+    cursor.execute("ANALYZE")
+
+
+def _unique_preferences(cursor):
+    # Keep the oldest copy of any duplicate preference, then enforce uniqueness so
+    # writes can use INSERT ... ON CONFLICT instead of a SELECT-then-INSERT
+    cursor.execute('''
+        DELETE FROM user_profile WHERE id NOT IN (
+            SELECT MIN(id) FROM user_profile GROUP BY user_id, preference_type, item_value
+        )
+    ''')
+    cursor.execute('''
+        CREATE UNIQUE INDEX IF NOT EXISTS ux_user_profile_pref
+        ON user_profile (user_id, preference_type, item_value)
+    ''')
+
+
+MIGRATIONS = [
+    (1, "Base tables", _base_tables),
+    (2, "Wikipedia and query enhancement caches", _cache_tables),
+    (3, "Compact interaction log items", _compact_log_items),
+    (4, "Covering indexes for chat history and user profile", _hot_query_indexes),
+    (5, "Unique user preferences", _unique_preferences),
+]
+
+
+def current_version(conn) -> int:
+    conn.execute('''
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    conn.commit()
+    return conn.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+
+
+def migrate(conn) -> int:
+    """Applies pending migrations in order. Returns the resulting schema version."""
+    version = current_version(conn)
+    for target, description, apply in MIGRATIONS:
+        if target <= version:
+            continue
+        # Take the write lock first so concurrent processes apply each migration once
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute("SELECT 1 FROM schema_version WHERE version = ?", (target,)).fetchone():
+                conn.rollback()  # Applied by another process meanwhile
+            else:
+                print(f"Applying schema migration {target}: {description}")
+                apply(conn.cursor())
+                conn.execute("INSERT INTO schema_version (version, description) VALUES (?, ?)", (target, description))
+                conn.commit()
+        except sqlite3.Error:
+            conn.rollback()
+            raise
+        version = target
+    return version
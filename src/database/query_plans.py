@@ -0,0 +1,91 @@
+"""EXPLAIN QUERY PLAN report for the database's hot queries.
+
+Prints SQLite's plan for each query DatabaseManager runs per request and flags any
+that scan a whole table or build a temporary sort instead of using an index. Exits with
+status 1 if one does, so it can guard schema changes in CI.
+
+Usage (from project root):
+    python -m src.database.query_plans [--db path/to/project.db]
+"""
+import argparse
+import os
+import sys
+
+# Add project root to path to allow imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(__file__))))
+
+from src.database.db_manager import DB_PATH, DatabaseManager
+
+# name -> (SQL exactly as issued by DatabaseManager, sample parameters)
+HOT_QUERIES = {
+    "authenticate_user": (
+        "SELECT id, username, email, full_name, profile_image FROM users WHERE username = ? AND password_hash = ?",
+        ("user", "hash"),
+    ),
+    "check_username": ("SELECT 1 FROM users WHERE username = ?", ("user",)),
+    "remove_preference": (
+        "DELETE FROM user_profile WHERE user_id = ? AND preference_type = ? AND item_value = ?",
+        (1, "DISLIKE", "Horror"),
+    ),
+    "get_user_profile": (
+        "SELECT preference_type, item_value, category FROM user_profile WHERE user_id = ?",
+        (1,),
+    ),
+    "get_chat_history": (
+        "SELECT id, query_text, tone, media_type, timestamp FROM interaction_logs WHERE user_id = ? "
+        "ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (1, 21),
+    ),
+    "get_chat_history_page": (
+        "SELECT id, query_text, tone, media_type, timestamp FROM interaction_logs WHERE user_id = ? "
+        "AND (timestamp, id) < (?, ?) ORDER BY timestamp DESC, id DESC LIMIT ?",
+        (1, "2025-01-01 00:00:00", 100, 21),
+    ),
+    "iter_interactions": (
+        "SELECT id, query_text, tone, media_type, agent_response, recommendations, rec_items, timestamp "
+        "FROM interaction_logs WHERE user_id = ? ORDER BY timestamp, id",
+        (1,),
+    ),
+    "get_interaction_details": (
+        "SELECT id, query_text, tone, media_type, agent_response, recommendations, rec_items, timestamp FROM interaction_logs WHERE id = ?",
+        (1,),
+    ),
+    "get_wiki_summaries": ("SELECT title, summary, fetched_at FROM wiki_cache WHERE title IN (?, ?)", ("a", "b")),
+    "get_cached_query": (
+        "SELECT enhanced_query FROM query_cache WHERE cache_key = ? AND created_at > ?",
+        ("key", 0.0),
+    ),
+}
+
+
+def plan_problems(plan):
+    """Plan steps that do not scale: full table scans and temporary sorts."""
+    problems = []
+    for detail in plan:
+        if detail.startswith("SCAN") and "INDEX" not in detail:
+            problems.append(detail)
+        elif "USE TEMP B-TREE" in detail:
+            problems.append(detail)
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show query plans for the hot database queries.")
+    parser.add_argument("--db", default=DB_PATH)
+    args = parser.parse_args()
+
+    db = DatabaseManager(args.db)
+    failing = 0
+    for name, (sql, params) in HOT_QUERIES.items():
+        plan = db.explain_query_plan(sql, params)
+        problems = plan_problems(plan)
+        failing += bool(problems)
+        print(f"{'FULL SCAN' if problems else 'OK':9} {name}")
+        for detail in plan:
+            print(f"          {detail}")
+    print(f"\n{len(HOT_QUERIES) - failing}/{len(HOT_QUERIES)} hot queries are index-backed.")
+    sys.exit(1 if failing else 0)
+
+
+if __name__ == "__main__":
+    main()
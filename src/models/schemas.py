@@ -20,6 +20,13 @@ class UserQuery(BaseModel):
     tone: ToneEnum = Field(ToneEnum.all, description="Emotional tone filter")
     media_type: MediaType = Field(MediaType.movie, description="Type of media to recommend")
     model: Optional[str] = Field("gemini-2.5-flash", description="AI Model to use")
+    k: int = Field(100, ge=1, le=500, description="Number of results to return")
+    fetch_k: int = Field(1000, ge=1, le=5000, description="Candidates fetched before diversity re-ranking")
+    mmr_lambda: float = Field(0.5, ge=0.0, le=1.0, description="MMR trade-off: 1 = pure relevance, 0 = max diversity")
+    diversify: bool = Field(True, description="Apply MMR diversity re-ranking")
+    tone_weight: float = Field(0.7, ge=0.0, le=1.0, description="Tone weight vs. query similarity: 1 = sort purely by tone")
+    page_size: Optional[int] = Field(None, ge=1, le=100, description="Results per page (omit to get all k at once)")
+    cursor: Optional[str] = Field(None, description="next_cursor from a previous response to fetch the following page")
 
 class RecommendationItem(BaseModel):
     title: str
@@ -30,7 +37,10 @@ class RecommendationItem(BaseModel):
     average_rating: float = Field(0.0, description="Average rating of the item")
     year: int = Field(0, description="Release year of the item")
     genres: List[str] = Field([], description="List of genres/categories")
+    item_id: Optional[str] = Field(None, description="Stable catalog item id")
+    score: Optional[float] = Field(None, description="Ranking score (similarity, or tone blend)")
 
 class AgentResponse(BaseModel):
     recommendations: List[RecommendationItem]
     agent_message: str = Field(..., description="Conversational response from the agent")
+    next_cursor: Optional[str] = Field(None, description="Pass back as UserQuery.cursor to get the next page")